@@ -0,0 +1,168 @@
+""" Fixtures of the benchmark suite: synthetic bipartite graphs of increasing sizes, and the measurement of the peak
+memory of a call.
+
+Run with ``pytest benchmarks/`` (they are not collected by the default test run). Graphs of more than ``--max-edges``
+edges (``1e5`` by default) are skipped, and so are those of the full heuristic on graphs of more than
+``--max-edges-minimize`` edges (``1e4`` by default); use ``--max-edges 1e7 --max-edges-minimize 1e7`` for the full
+range. Pass ``--benchmark-json`` to keep
+the timings, and the peak memory (in ``extra_info``), for a later ``pytest-benchmark compare``.
+"""
+import gc
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from biSBM.utils import assemble_edgelist_old2new, assemble_old2new_mapping, gen_bicliques_edgelist, \
+    gen_bisbm_edgelist, gen_e_rs, gen_equal_bipartite_partition
+
+SIZES = [int(1e3), int(1e4), int(1e5), int(1e6), int(1e7)]
+
+# number of planted blocks (or bi-cliques) of each type, and average degree of the synthetic graphs
+N_BLOCKS = 10
+AVG_DEG = 10
+
+_peak_memory = []
+
+
+def pytest_addoption(parser):
+    parser.addoption("--max-edges", action="store", type=float, default=1e5,
+                     help="skip the benchmarks on graphs with more edges than this (default: 1e5)")
+    parser.addoption("--max-edges-minimize", action="store", type=float, default=1e4,
+                     help="skip the end-to-end benchmarks on graphs with more edges than this (default: 1e4)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "max_rounds(n): cap the number of timed rounds of the benchmark")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _peak_memory:
+        return
+    terminalreporter.section("peak memory (MiB)")
+    terminalreporter.write_line("{:<72} {:>12} {:>12}".format("name", "traced", "rss"))
+    for name, traced, rss in _peak_memory:
+        rss = "-" if rss is None else "{:.1f}".format(rss / 2 ** 20)
+        terminalreporter.write_line("{:<72} {:>12.1f} {:>12}".format(name, traced / 2 ** 20, rss))
+
+
+class Graph(object):
+    """A synthetic graph, with its planted partition."""
+    def __init__(self, edgelist, na, nb, ka, kb, mb):
+        self.edgelist = edgelist
+        self.na = na
+        self.nb = nb
+        self.ka = ka
+        self.kb = kb
+        self.mb = mb
+        self.types = np.array([1] * na + [2] * nb, dtype=np.int_)
+
+
+def gen_planted_graph(n_edges, b=N_BLOCKS, p=0.1, seed=42):
+    """Sample a (multi)graph of about ``n_edges`` edges, with ``b`` equal blocks of each type, whose edge counts
+    between blocks are given by :func:`biSBM.utils.gen_e_rs`, with :func:`biSBM.utils.gen_bisbm_edgelist`."""
+    na = nb = max(n_edges // AVG_DEG, b)
+    mb = gen_equal_bipartite_partition(na, nb, b, b)
+    edgelist = gen_bisbm_edgelist(gen_e_rs(b, n_edges, p), np.bincount(mb), b, seed=seed)
+    return Graph(edgelist, na, nb, b, b, mb)
+
+
+def gen_bicliques_graph(n_edges, b=N_BLOCKS):
+    """Disjoint union of ``b`` bi-cliques of about ``n_edges / b`` edges each, from
+    :func:`biSBM.utils.gen_bicliques_edgelist`, relabeled so that the type-*a* nodes come first."""
+    num_nodes = 2 * max(int(round((n_edges / b) ** 0.5)), 1)
+    el, types = gen_bicliques_edgelist(b, num_nodes)
+    old2new, new2old, types = assemble_old2new_mapping(types)
+    edgelist = assemble_edgelist_old2new(el, old2new)
+    na = nb = b * num_nodes // 2
+    # the i-th bi-clique holds the type-a nodes i * num_nodes / 2, ... and the same type-b ones
+    mb = np.arange(na + nb) // (num_nodes // 2)
+    return Graph(edgelist, na, nb, b, b, mb)
+
+
+_GENERATORS = {
+    "planted": gen_planted_graph,
+    "bicliques": gen_bicliques_graph,
+}
+_graphs = {}
+
+
+@pytest.fixture(params=SIZES, ids=lambda x: "1e{}".format(len(str(x)) - 1))
+def n_edges(request):
+    if request.param > request.config.getoption("--max-edges"):
+        pytest.skip("more than --max-edges edges")
+    return request.param
+
+
+@pytest.fixture(params=sorted(_GENERATORS))
+def graph(request, n_edges):
+    key = (request.param, n_edges)
+    if key not in _graphs:
+        # keep the graph of a single size at a time, since the largest ones take a few hundred MiB
+        _graphs.clear()
+        gc.collect()
+        _graphs[key] = _GENERATORS[request.param](n_edges)
+    return _graphs[key]
+
+
+@pytest.fixture
+def bench(request, benchmark, n_edges):
+    """Time ``func(*args)``, then record its peak memory (in bytes) in ``benchmark.extra_info``.
+
+    The first call, which also compiles the Numba kernels, is a warmup round that is not timed. The number of timed
+    rounds decreases with the size of the graph, down to one, and is at most that of the ``max_rounds`` marker.
+    """
+    marker = request.node.get_closest_marker("max_rounds")
+    max_rounds = 10 if marker is None else marker.args[0]
+
+    def run(func, *args, **kwargs):
+        rounds = int(min(max(1e6 // n_edges, 1), max_rounds))
+        result = benchmark.pedantic(func, args=args, kwargs=kwargs, rounds=rounds, warmup_rounds=1)
+        traced, rss = measure_peak_memory(func, *args, **kwargs)
+        benchmark.extra_info["peak_traced_bytes"] = traced
+        benchmark.extra_info["peak_rss_bytes"] = rss
+        _peak_memory.append((request.node.name, traced, rss))
+        return result
+    return run
+
+
+def measure_peak_memory(func, *args, **kwargs):
+    """Return the peak memory allocated during ``func(*args, **kwargs)``.
+
+    Returns
+    -------
+    traced : ``int``
+        Peak number of bytes allocated by Python and NumPy, from :mod:`tracemalloc`. Arrays allocated inside the
+        Numba kernels are not traced.
+
+    rss : ``int`` or ``None``
+        Increase of the peak resident set size of the process, which includes the kernels. Only available on Linux,
+        where the peak can be reset; ``None`` elsewhere.
+    """
+    gc.collect()
+    rss_0 = _reset_peak_rss()
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, traced = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    rss = None if rss_0 is None else max(_read_status("VmHWM") - rss_0, 0)
+    return traced, rss
+
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _read_status("VmRSS")
+    except OSError:
+        return None
+
+
+def _read_status(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    raise OSError("[ERROR] {} not found in /proc/self/status".format(field))
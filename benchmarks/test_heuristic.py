@@ -0,0 +1,22 @@
+import pytest
+import biSBM as bm
+
+
+def minimize_bisbm_dl(graph):
+    mcmc = bm.engines.NumbaMCMC(n_sweeps=1)
+    oks = bm.OptimalKs(mcmc, graph.edgelist, graph.types, default_args=True, seed=42)
+    # a shorter schedule than the default one, which scales as 1e5 sweeps per engine call
+    n = graph.na + graph.nb
+    mcmc.set_steps(100 * n)
+    mcmc.set_await_steps(10 * n)
+    mcmc.set_cooling_param_1(10 * n)
+    oks.minimize_bisbm_dl()
+    return oks.summary()
+
+
+@pytest.mark.max_rounds(3)
+def test_minimize_bisbm_dl(request, bench, graph, n_edges):
+    if n_edges > request.config.getoption("--max-edges-minimize"):
+        pytest.skip("more than --max-edges-minimize edges")
+    summary = bench(minimize_bisbm_dl, graph)
+    assert summary["ka"] >= 1 and summary["kb"] >= 1
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from biSBM.int_part import init_q_cache
+from biSBM.utils import adjacency_entropy, assemble_e_rs_from_mb, assemble_eta_rk_from_edgelist_and_mb, \
+    assemble_merge_candidates, degree_entropy, virtual_moves_ds
+
+
+def test_adjacency_entropy(bench, graph):
+    bench(adjacency_entropy, graph.edgelist, graph.mb)
+
+
+def test_degree_entropy(bench, graph):
+    q_cache = init_q_cache(int(1e4))
+    # fill the look-up table beforehand, so that only the entropy is timed
+    degree_entropy(graph.edgelist, graph.mb, q_cache)
+    bench(degree_entropy, graph.edgelist, graph.mb, q_cache)
+
+
+@pytest.mark.parametrize("sparse", [False, True], ids=["dense", "sparse"])
+def test_assemble_e_rs_from_mb(bench, graph, sparse):
+    bench(assemble_e_rs_from_mb, graph.edgelist, graph.mb, sparse=sparse)
+
+
+@pytest.mark.parametrize("sparse", [False, True], ids=["dense", "sparse"])
+def test_assemble_eta_rk_from_edgelist_and_mb(bench, graph, sparse):
+    bench(assemble_eta_rk_from_edgelist_and_mb, graph.edgelist, graph.mb, sparse=sparse)
+
+
+def test_virtual_moves_ds(bench, graph, n_edges):
+    # as many blocks as the heuristic starts from, i.e., sqrt(E) in total, with a random partition
+    rng = np.random.default_rng(42)
+    ka = kb = min(max(int(n_edges ** 0.5) // 2, 2), graph.na)
+    mb = np.concatenate((rng.integers(ka, size=graph.na), ka + rng.integers(kb, size=graph.nb)))
+    e_rs = assemble_e_rs_from_mb(graph.edgelist, mb)
+    mlists = assemble_merge_candidates(ka, kb, nm=10, rng=rng)
+    bench(virtual_moves_ds, e_rs, mlists, ka)
+
+
+def test_init_q_cache(bench, n_edges):
+    # the heuristic never builds a table larger than 1e4
+    if n_edges > 1e4:
+        pytest.skip("the look-up table is capped at 1e4")
+
+    def fill(n_max):
+        q_cache = init_q_cache(n_max)
+        return q_cache[n_max, n_max]
+
+    bench(fill, n_edges)
@@ -0,0 +1,327 @@
+""" Bounded-memory bookkeeping of the partitions and edge count matrices visited by the heuristic, checkpoints, and a
+persistent cache of the engine results. """
+import os
+import json
+import zlib
+import pickle
+import hashlib
+import tempfile
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+import numpy as np
+
+from biSBM.utils import MergedPartition
+
+
+class MemoryBudget(object):
+    """Memory budget shared by several :class:`ArrayStore`.
+
+    Whenever the entries held in memory by the stores exceed ``max_bytes``, they are spilled to ``spill_dir`` (if it
+    is set) or evicted, those of the highest ``rank`` first.
+
+    Parameters
+    ----------
+    max_bytes : ``int`` (optional, default: ``None``)
+        Maximal number of bytes held in memory. If ``None``, there is no limit.
+
+    spill_dir : ``str`` (optional, default: ``None``)
+        Directory where the entries over the budget are written to. If ``None``, they are evicted instead (unless
+        they are protected).
+
+    protect : ``callable`` (optional, default: ``None``)
+        Function that returns the keys that must never be evicted.
+
+    rank : ``callable`` (optional, default: ``None``)
+        Function of a key; the entries of the highest rank are spilled (or evicted) first. Among the entries of the
+        same rank, the oldest one goes first. If ``None``, all entries have the same rank.
+
+    """
+    def __init__(self, max_bytes=None, spill_dir=None, protect=None, rank=None):
+        self.max_bytes = None if max_bytes is None else int(max_bytes)
+        self.spill_dir = spill_dir
+        self.protect = protect
+        self.rank = rank
+        self.stores = []
+
+    @property
+    def nbytes(self):
+        return _resident_bytes(self.stores)
+
+    def enforce(self):
+        """Spill or evict entries until the stores fit in the budget, if possible."""
+        if self.max_bytes is None or self.nbytes <= self.max_bytes:
+            return
+        protected = set() if self.protect is None else set(self.protect())
+        candidates = []
+        for store in self.stores:
+            for age, (key, entry) in enumerate(store._entries.items()):
+                if entry.in_memory:
+                    rank = 0 if self.rank is None else self.rank(key)
+                    candidates += [(key in protected, -rank, age, store, key)]
+        # unprotected entries first, then the highest rank, then the oldest
+        candidates.sort(key=lambda x: x[:3])
+        for is_protected, _, _, store, key in candidates:
+            # recounted each time, since a base partition is only freed with the last entry that shares it
+            if self.nbytes <= self.max_bytes:
+                break
+            if self.spill_dir is not None:
+                store._spill(key)
+            elif not is_protected:
+                del store[key]
+
+
+class ArrayStore(MutableMapping):
+    """Insertion-ordered mapping of integer arrays, which are kept in the smallest dtype that fits, and compressed.
+
+    Items are decoded back to :class:`numpy.ndarray` of ``int`` on access. A :class:`biSBM.utils.MergedPartition` is
+    kept as is, since it only holds a block label map, until it is spilled; its base partition is charged once, however
+    many entries share it.
+
+    Parameters
+    ----------
+    budget : :class:`MemoryBudget` (optional, default: ``None``)
+        The memory budget that this store shares. If ``None``, there is no limit.
+
+    compress : ``bool`` (optional, default: ``True``)
+        Whether to compress the arrays with :mod:`zlib`.
+
+    """
+    def __init__(self, budget=None, compress=True):
+        self.budget = MemoryBudget() if budget is None else budget
+        self.budget.stores += [self]
+        self.compress = bool(compress)
+        self._entries = OrderedDict()
+
+    @property
+    def nbytes(self):
+        """Number of bytes held in memory."""
+        return _resident_bytes([self])
+
+    def __getitem__(self, key):
+        return self._entries[key].get()
+
+    def __setitem__(self, key, value):
+        if key in self._entries:
+            self._entries[key].discard()
+        if isinstance(value, MergedPartition):
+            self._entries[key] = _Entry(value, value.label.nbytes + value.n_r.nbytes)
+        else:
+            self._entries[key] = _Entry(*pack_array(value, self.compress))
+        self.budget.enforce()
+
+    def __delitem__(self, key):
+        self._entries.pop(key).discard()
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _spill(self, key):
+        entry = self._entries[key]
+        if isinstance(entry.data, MergedPartition):
+            entry.data, entry.nbytes = pack_array(entry.data, self.compress)
+        fd, path = tempfile.mkstemp(suffix=".bin", dir=self.budget.spill_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(entry.data[2])
+        entry.data = entry.data[:2] + (path,) + entry.data[3:]
+        entry.in_memory = False
+
+
+def _resident_bytes(stores):
+    """Number of bytes held in memory by the entries of ``stores``, and by the distinct base partitions of their
+    :class:`biSBM.utils.MergedPartition`."""
+    nbytes = 0
+    bases = dict()
+    for store in stores:
+        for entry in store._entries.values():
+            if entry.in_memory:
+                nbytes += entry.nbytes
+                if isinstance(entry.data, MergedPartition):
+                    bases[id(entry.data.mb)] = entry.data.mb.nbytes
+    return nbytes + sum(bases.values())
+
+
+class _Entry(object):
+    def __init__(self, data, nbytes):
+        self.data = data
+        self.nbytes = nbytes
+        self.in_memory = True
+
+    def get(self):
+        if isinstance(self.data, MergedPartition):
+            return self.data
+        if self.in_memory:
+            return unpack_array(self.data)
+        with open(self.data[2], "rb") as f:
+            return unpack_array(self.data[:2] + (f.read(),) + self.data[3:])
+
+    def discard(self):
+        if not self.in_memory:
+            os.remove(self.data[2])
+
+
+def pack_array(value, compress=True):
+    """Encode an array in the smallest (integer) dtype that fits, and optionally compress it.
+
+    Parameters
+    ----------
+    value : ``iterable`` or :class:`numpy.ndarray`
+
+    compress : ``bool`` (optional, default: ``True``)
+
+    Returns
+    -------
+    packed : ``tuple``
+        The ``(dtype, shape, bytes, compressed)`` to pass to :func:`unpack_array`.
+
+    nbytes : ``int``
+        Number of bytes of the encoded array.
+
+    """
+    arr = np.asarray(value)
+    if arr.dtype.kind in "iub":
+        arr = arr.astype(_smallest_dtype(arr), copy=False)
+    buf = np.ascontiguousarray(arr).tobytes()
+    if compress:
+        buf = zlib.compress(buf, 1)
+    return (arr.dtype, arr.shape, buf, bool(compress)), len(buf)
+
+
+def unpack_array(packed):
+    """Decode an array encoded by :func:`pack_array`; integer arrays are returned with the ``int`` dtype."""
+    dtype, shape, buf, compressed = packed
+    if compressed:
+        buf = zlib.decompress(buf)
+    arr = np.frombuffer(buf, dtype=dtype).reshape(shape)
+    if arr.dtype.kind in "iub":
+        return arr.astype(np.int_)
+    return arr.copy()
+
+
+def _smallest_dtype(arr):
+    if arr.size == 0:
+        return np.uint8
+    lo, hi = int(np.min(arr)), int(np.max(arr))
+    if lo >= 0:
+        return np.min_scalar_type(hi)
+    return np.promote_types(np.min_scalar_type(lo), np.min_scalar_type(-hi - 1))
+
+
+class Checkpoint(object):
+    """Append-only file of pickled records, the first of which is a header.
+
+    Each record is flushed to disk as soon as it is appended, so that a process that dies loses at most the record
+    being written; a truncated last record is skipped by :func:`read`, and cut off the file when the next record is
+    appended.
+
+    Parameters
+    ----------
+    path : ``str``
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self._end = None  # the end of the last complete record, if `read` found a truncated one after it
+
+    def start(self, header):
+        """Start a new file (overwriting ``path``) with ``header``."""
+        self._end = None
+        with open(self.path, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def append(self, record):
+        if self._end is not None:
+            os.truncate(self.path, self._end)
+            self._end = None
+        with open(self.path, "ab") as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self):
+        """Return the header and the list of records; the file is left as it is."""
+        records = []
+        with open(self.path, "rb") as f:
+            header = pickle.load(f)
+            end = f.tell()
+            while True:
+                try:
+                    records += [pickle.load(f)]
+                except (EOFError, pickle.UnpicklingError, ValueError, IndexError):
+                    break
+                end = f.tell()
+        self._end = end if end < os.path.getsize(self.path) else None
+        return header, records
+
+
+class ResultCache(object):
+    """Persistent, content-addressed cache of engine results, which can be shared by many
+    :class:`biSBM.OptimalKs` instances and processes.
+
+    Each result is a file in ``cache_dir``, named after the hash of its key, and written atomically. When the files
+    take more than ``max_bytes``, the least recently used ones are removed.
+
+    Parameters
+    ----------
+    cache_dir : ``str``
+
+    max_bytes : ``int`` (optional, default: ``None``)
+        Maximal size of the cache. If ``None``, there is no limit.
+
+    """
+    def __init__(self, cache_dir, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = None if max_bytes is None else int(max_bytes)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key):
+        """Return the result stored under ``key``, or ``None``."""
+        path = self._get_path(key)
+        try:
+            with open(path, "rb") as f:
+                key_, result = pickle.load(f)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if key_ != _canonical(key):
+            return None
+        return result
+
+    def put(self, key, result):
+        """Store ``result`` (any picklable object) under ``key``, a ``dict`` of JSON-serializable values."""
+        fd, path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((_canonical(key), result), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path, self._get_path(key))
+        self._evict()
+
+    def _get_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(_canonical(key).encode()).hexdigest() + ".pkl")
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except OSError:  # removed by another process
+                    continue
+                files += [(stat.st_mtime, stat.st_size, entry.path)]
+        nbytes = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if nbytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            nbytes -= size
+
+
+def _canonical(key):
+    return json.dumps(key, sort_keys=True, default=str)
@@ -16,11 +16,16 @@ References
    :arxiv:`1610.02703`
 
 """
+import os
+import re
+import tempfile
 import numpy as np
 from numba import njit
 
 from scipy.special import gammaln, spence, loggamma
 
+# bump whenever the recurrence in `_fill_rows` or the on-disk layout changes, so that stale tables are ignored
+Q_CACHE_VERSION = 1
 
 # for computing the number of restricted partitions of the integer m into at most n pairs
 def log_q(n, k, __q_cache):
@@ -32,7 +37,7 @@ def log_q(n, k, __q_cache):
 
     k : ``int``
 
-    __q_cache : :class:`numpy.ndarray`
+    __q_cache : :class:`QCache` or :class:`numpy.ndarray`
 
     Returns
     -------
@@ -44,8 +49,8 @@ def log_q(n, k, __q_cache):
         return 0
     if k > n:
         k = n
-    if n < __q_cache.shape[0]:
-        return __q_cache[n][k]
+    if n < len(__q_cache):
+        return __q_cache[n, k]
     return log_q_approx(n, k)
 
 
@@ -107,36 +112,164 @@ def log_q_approx(n, k):
     return lf - np.log(n) + np.sqrt(n) * g
 
 
-def init_q_cache(n_max, __q_cache=np.array([], ndmin=2)):
+class QCache(object):
+    """Triangular, lazily-filled look-up table for :math:`\\log q(n, k)`.
+
+    Only the entries with :math:`k \\leq n` are stored, row after row, in a flat buffer (``q_cache[n, k]`` with
+    :math:`k > n` returns :math:`\\log q(n, n)`). Rows are computed the first time they are touched (together with all
+    the rows below them, which the recurrence needs), so that a graph whose blocks never have more than a few hundred
+    edges never pays for the full table.
+
+    Parameters
+    ----------
+    n_max : ``int``
+        Largest :math:`n` served by the table; :func:`log_q` falls back to :func:`log_q_approx` above it.
+
+    path : ``str`` (optional, default: ``None``)
+        If given, the full table is stored as a ``.npy`` file at ``path`` (computed once, if the file does not exist
+        yet) and memory-mapped read-only, so that many worker processes can share the same pages.
+
+    """
+    def __init__(self, n_max, path=None):
+        self.n_max = int(n_max)
+        self.path = path
+        if path is None:
+            self._table = np.empty(0, dtype=np.float64)
+            self._n_filled = 0
+        else:
+            self._table = _open_q_table(path, self.n_max)
+            self._n_filled = self.n_max + 1
+
+    def __len__(self):
+        return self.n_max + 1
+
+    def __getitem__(self, nk):
+        n, k = nk
+        if not 0 <= n <= self.n_max or k < 0:
+            raise IndexError("[ERROR] q({}, {}) is out of the table, whose n_max is {}.".format(n, k, self.n_max))
+        k = min(k, n)  # q(n, k) = q(n, n) for k > n
+        if n >= self._n_filled:
+            self._fill_until(n)
+        return self._table[_row_offset(n) + k]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.path is not None:
+            # workers re-open the memory map instead of receiving a copy of the table
+            del state["_table"]
+        else:
+            state["_table"] = self._table[:_row_offset(self._n_filled)]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.path is not None:
+            self._table = _open_q_table(self.path, self.n_max)
+
+    @property
+    def nbytes(self):
+        return self._table.nbytes
+
+    def _fill_until(self, n):
+        n_rows = min(max(n + 1, 2 * self._n_filled), self.n_max + 1)
+        if _row_offset(n_rows) > self._table.size:
+            self._table = np.resize(self._table, _row_offset(n_rows))
+        _fill_rows(self._table, self._n_filled, n_rows)
+        self._n_filled = n_rows
+
+
+def init_q_cache(n_max, path=None, cache_dir=None):
     """Initiate the look-up table for :math:`q(m, n)`.
 
     Parameters
     ----------
     n_max : ``int``
 
-    __q_cache : :class:`numpy.ndarray` (required, default: ``np.array([], ndmin=2)``)
+    path : ``str`` (optional, default: ``None``)
+        Where to keep a memory-mapped copy of the table; see :class:`QCache`.
+
+    cache_dir : ``str`` (optional, default: ``None``)
+        Directory of persistent tables shared across runs; see :func:`get_q_cache_path`. Ignored if ``path`` is set.
+        If both are ``None``, the ``BISBM_CACHE_DIR`` environment variable is used, if it is set.
+
+    Returns
+    -------
+    q_cache : :class:`QCache`
+
+    """
+    if path is None:
+        if cache_dir is None:
+            cache_dir = os.environ.get("BISBM_CACHE_DIR")
+        if cache_dir is not None:
+            path = get_q_cache_path(n_max, cache_dir)
+    return QCache(n_max, path=path)
+
+
+def get_q_cache_path(n_max, cache_dir):
+    """Return the file in ``cache_dir`` that holds (or will hold) the table for ``n_max``.
+
+    Tables are named ``q_cache-v<Q_CACHE_VERSION>-<n_max>.npy``. Since the table is stored row by row, any table with
+    a larger ``n_max`` also serves the smaller ones, so the smallest such file is reused if there is one.
+
+    Parameters
+    ----------
+    n_max : ``int``
+
+    cache_dir : ``str``
 
     Returns
     -------
+    path : ``str``
 
     """
-    old_n = __q_cache.shape[0]
-    if old_n >= n_max:
-        return
-    __q_cache = np.resize(__q_cache, [n_max + 1, n_max + 1])
-    __q_cache.fill(-np.inf)
-    return __fill_cache(__q_cache, n_max)
+    n_max = int(n_max)
+    cache_dir = os.path.expanduser(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    pattern = re.compile(r"^q_cache-v{}-(\d+)\.npy$".format(Q_CACHE_VERSION))
+    sizes = []
+    for f in os.listdir(cache_dir):
+        m = pattern.match(f)
+        if m is not None and int(m.group(1)) >= n_max:
+            sizes += [int(m.group(1))]
+    n = min(sizes) if len(sizes) > 0 else n_max
+    return os.path.join(cache_dir, "q_cache-v{}-{}.npy".format(Q_CACHE_VERSION, n))
+
+
+def _row_offset(n):
+    return n * (n + 1) // 2
+
+
+def _open_q_table(path, n_max):
+    try:
+        table = np.load(path, mmap_mode="r")
+    except (IOError, ValueError):
+        table = None
+    if table is None or table.size < _row_offset(n_max + 1):
+        table = np.empty(_row_offset(n_max + 1), dtype=np.float64)
+        _fill_rows(table, 0, n_max + 1)
+        # write to a scratch file first, so that concurrent readers never see a partially written table
+        f = tempfile.NamedTemporaryFile(mode="wb", dir=os.path.dirname(os.path.abspath(path)), suffix=".npy",
+                                        delete=False)
+        with f:
+            np.save(f, table)
+        os.replace(f.name, path)
+        table = np.load(path, mmap_mode="r")
+    return table
 
 
 @njit(cache=True)
-def __fill_cache(cache, n_max):
-    for n in range(1, n_max + 1):
-        cache[n][1] = 0
+def _fill_rows(table, start, stop):
+    for n in range(start, stop):
+        row = n * (n + 1) // 2
+        table[row: row + n + 1] = -np.inf
+        if n == 0:
+            continue
+        table[row + 1] = 0
         for k in range(2, n + 1):
-            cache[n][k] = log_sum(cache[n][k], cache[n][k - 1])
-            if n > k:
-                cache[n][k] = log_sum(cache[n][k], cache[n - k][k])
-    return cache
+            table[row + k] = log_sum(table[row + k], table[row + k - 1])
+            if n - k >= k:  # q(n - k, k) is only tabulated for k <= n - k
+                table[row + k] = log_sum(table[row + k], table[(n - k) * (n - k + 1) // 2 + k])
+    return table
 
 
 @njit(cache=True)
@@ -1,47 +1,327 @@
 """ i/o utilities """
+import io
+import os
+import struct
+import warnings
+import zipfile
 import numpy as np
+from numba import njit
 
 
-def get_edgelist(f_edgelist, delimiter=None):
+def get_edgelist(f_edgelist, delimiter=None, comments="#", dtype=np.int_, chunk_size=2 ** 24):
     """
-    This function returns an edgelist list from a file.
+    This function returns an edgelist array from a file.
+
+    The file is parsed in chunks of about ``chunk_size`` bytes, with the C reader of :func:`numpy.loadtxt`, straight
+    into a preallocated array. Only the first two columns of each row are read; blank lines and comments are skipped.
 
     Parameters
     ----------
     f_edgelist : ``str``
         The path to the edgelist text file.
 
-    delimiter : ``str``
-        The delimiter that separate the edges.
+    delimiter : ``str`` (optional, default: ``None``)
+        The delimiter that separate the edges. If ``None``, it is detected (once) from the first row, trying
+        whitespace and then ``","``. Note that spaces and tabs are interchangeable.
+
+    comments : ``str`` (optional, default: ``"#"``)
+        The character that starts a comment. Use ``None`` if there are no comments.
+
+    dtype : ``type`` (optional, default: :class:`numpy.int_`)
+        The integer type of the array, e.g., :class:`numpy.int32` to halve the memory for large graphs.
+
+    chunk_size : ``int`` (optional, default: ``2 ** 24``)
+        Approximate number of bytes parsed at a time.
 
     Returns
     -------
     edgelist : :class:`numpy.ndarray`
         The numpy list of tupled edges.
+
+    Raises
+    ------
+    ValueError
+        If a row does not start with two integers, or the delimiter cannot be detected.
+
+    """
+    if delimiter is not None and delimiter.isspace():
+        delimiter = " "
+    edgelist = _RowBuffer(f_edgelist, dtype)
+    for chunk, lineno in _read_chunks(f_edgelist, chunk_size):
+        if delimiter is None:
+            delimiter = _detect_delimiter(chunk, comments, lineno)
+        edgelist.append(_parse_edgelist_chunk(chunk, delimiter, comments, lineno, dtype), chunk)
+    return edgelist.to_array()
+
+
+def relabel_edgelist(f_edgelist, delimiter=None, comments="#", dtype=np.int64, chunk_size=2 ** 24):
+    """Stream an edgelist with raw node ids, and relabel the nodes with dense ids sorted by type.
+
+    The source (first column) of each edge is a type-`a` node, and the target (second column) is a type-`b` node,
+    e.g., users and items. Type-`a` nodes get the ids :math:`0, \\ldots, n_a - 1` and type-`b` nodes the ids
+    :math:`n_a, \\ldots, n_a + n_b - 1`, as they are first seen; the same raw id in the two columns makes two
+    different nodes. The file is parsed in chunks of about ``chunk_size`` bytes, with the C reader of
+    :func:`numpy.loadtxt`, and integer ids are looked up in a hash table compiled with Numba.
+
+    Parameters
+    ----------
+    f_edgelist : ``str``
+        The path to the edgelist text file.
+
+    delimiter : ``str`` (optional, default: ``None``)
+        The delimiter that separate the edges. If ``None``, use ``","`` if the first row has one, and whitespace
+        otherwise.
+
+    comments : ``str`` (optional, default: ``"#"``)
+        The character that starts a comment. Use ``None`` if there are no comments.
+
+    dtype : ``type`` (optional, default: :class:`numpy.int64`)
+        Type of the raw ids; an integer type, or ``str`` for arbitrary ids.
+
+    chunk_size : ``int`` (optional, default: ``2 ** 24``)
+        Approximate number of bytes parsed at a time.
+
+    Returns
+    -------
+    edgelist : :class:`numpy.ndarray`
+        The relabelled edgelist, directly applicable to :class:`biSBM.OptimalKs`.
+
+    types : :class:`numpy.ndarray`
+        The types-array, i.e., ``na`` ones followed by ``nb`` twos.
+
+    new2old : :class:`numpy.ndarray`
+        The raw id of each node.
+
     """
-    edgelist = []
+    if delimiter is not None and delimiter.isspace():
+        delimiter = " "
+    is_str = np.dtype(dtype).kind in "US"
+    ids_a, ids_b = _IdMap(is_str), _IdMap(is_str)
+    edgelist = _RowBuffer(f_edgelist, np.int_)
+    for chunk, lineno in _read_chunks(f_edgelist, chunk_size):
+        if is_str:
+            if delimiter is None:
+                for line in chunk.splitlines():
+                    line = _strip_comments(line, comments)
+                    if line:
+                        delimiter = "," if "," in line else " "
+                        break
+            edges = _parse_raw_edgelist_chunk(chunk, delimiter, comments, lineno)
+        else:
+            if delimiter is None:
+                delimiter = _detect_delimiter(chunk, comments, lineno)
+            edges = _parse_edgelist_chunk(chunk, delimiter, comments, lineno, dtype)
+        edgelist.append(np.column_stack((ids_a.get(edges[:, 0]), ids_b.get(edges[:, 1]))), chunk)
+
+    edgelist = edgelist.to_array()
+    na, nb = len(ids_a), len(ids_b)
+    edgelist[:, 1] += na
+    types = np.repeat(np.array([1, 2], dtype=np.int_), [na, nb])
+    new2old = np.concatenate((ids_a.keys(), ids_b.keys()))
+    return edgelist, types, new2old
+
+
+def _read_chunks(f_edgelist, chunk_size):
+    """Yield chunks of about ``chunk_size`` characters that end with a complete row, and their first line number
+    (0-indexed)."""
+    lineno = 0
     with open(f_edgelist, "r") as f:
-        for line in f:
-            line = line.replace('\r', '').replace('\n', '')  # remove all line breaks!
-            if delimiter is not None:
-                edge = line.split(delimiter)
-                edgelist.append((int(edge[0]), int(edge[1])))
-            else:
-                try:
-                    edge = line.split(' ')
-                    edgelist.append((int(edge[0]), int(edge[1])))
-                except ValueError:
-                    try:
-                        edge = line.split('\t')
-                        edgelist.append((int(edge[0]), int(edge[1])))
-                    except ValueError:
-                        try:
-                            edge = line.split(',')
-                            edgelist.append((int(edge[0]), int(edge[1])))
-                        except ValueError:
-                            raise ValueError("Tried delimiters ' ', '\t', and ',', but none work...")
-
-    return np.array(edgelist, dtype=np.int_)
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            chunk += f.readline()  # complete the last row
+            yield chunk, lineno
+            lineno += chunk.count("\n")
+
+
+class _RowBuffer(object):
+    """Two-column array that grows as rows are appended; preallocated by extrapolating the first chunk to the whole
+    file."""
+    def __init__(self, f_edgelist, dtype):
+        self.size = os.path.getsize(f_edgelist)
+        self.dtype = dtype
+        self.array = None
+        self.n_rows = 0
+
+    def append(self, rows, chunk):
+        if self.array is None:
+            n_rows = int(len(rows) * self.size / len(chunk) * 1.05) + 1
+            self.array = np.empty((max(n_rows, len(rows)), 2), dtype=self.dtype)
+        elif self.n_rows + len(rows) > len(self.array):
+            self.array.resize((max(int(len(self.array) * 1.5), self.n_rows + len(rows)), 2), refcheck=False)
+        self.array[self.n_rows: self.n_rows + len(rows)] = rows
+        self.n_rows += len(rows)
+
+    def to_array(self):
+        if self.array is None:
+            return np.empty((0, 2), dtype=self.dtype)
+        self.array.resize((self.n_rows, 2), refcheck=False)
+        return self.array
+
+
+class _IdMap(object):
+    """Assign dense ids (``0, 1, ...``) to raw ids, in the order they are first seen."""
+    def __init__(self, is_str=False):
+        self.is_str = is_str
+        if is_str:
+            self._ids = dict()
+            self._keys = []
+        else:
+            # open addressing, with linear probing; `_table_ids` is -1 for empty slots
+            self._table_keys = np.zeros(1024, dtype=np.int64)
+            self._table_ids = np.full(1024, -1, dtype=np.int64)
+            self._keys = np.empty(1024, dtype=np.int64)
+            self._n_ids = 0
+
+    def __len__(self):
+        return len(self._ids) if self.is_str else self._n_ids
+
+    def get(self, keys):
+        """Return the ids of ``keys``, assigning new ids to new keys."""
+        if self.is_str:
+            # look up each distinct key of the chunk only once, in the order they are first seen
+            uniques, index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            order = np.argsort(index)
+            ids = np.empty(len(uniques), dtype=np.int_)
+            for ind, key in zip(order.tolist(), uniques[order].tolist()):
+                _id = self._ids.setdefault(key, len(self._ids))
+                if _id == len(self._keys):
+                    self._keys.append(key)
+                ids[ind] = _id
+            return ids[inverse]
+
+        keys = np.asarray(keys, dtype=np.int64)
+        while 2 * (self._n_ids + len(keys)) > len(self._table_ids):
+            self._table_keys, self._table_ids = _rehash(self._table_keys, self._table_ids, 2 * len(self._table_ids))
+        if self._n_ids + len(keys) > len(self._keys):
+            self._keys.resize(max(2 * len(self._keys), self._n_ids + len(keys)), refcheck=False)
+        ids = np.empty(len(keys), dtype=np.int_)
+        self._n_ids = _hash_lookup(self._table_keys, self._table_ids, self._keys, self._n_ids, keys, ids)
+        return ids
+
+    def keys(self):
+        """Return the raw ids, in the order of their ids."""
+        if self.is_str:
+            return np.array(self._keys, dtype=str)
+        return self._keys[:self._n_ids].copy()
+
+
+@njit(cache=True)
+def _hash_slot(key, mask):
+    # Fibonacci hashing
+    return np.int64((np.uint64(key) * np.uint64(11400714819323198485)) >> np.uint64(32)) & mask
+
+
+@njit(cache=True)
+def _hash_lookup(table_keys, table_ids, id2key, n_ids, keys, ids):
+    mask = len(table_ids) - 1
+    for i in range(len(keys)):
+        key = keys[i]
+        slot = _hash_slot(key, mask)
+        while table_ids[slot] != -1 and table_keys[slot] != key:
+            slot = (slot + 1) & mask
+        if table_ids[slot] == -1:
+            table_keys[slot] = key
+            table_ids[slot] = n_ids
+            id2key[n_ids] = key
+            n_ids += 1
+        ids[i] = table_ids[slot]
+    return n_ids
+
+
+@njit(cache=True)
+def _rehash(table_keys, table_ids, capacity):
+    new_keys = np.zeros(capacity, dtype=np.int64)
+    new_ids = np.full(capacity, -1, dtype=np.int64)
+    mask = capacity - 1
+    for i in range(len(table_ids)):
+        if table_ids[i] != -1:
+            slot = _hash_slot(table_keys[i], mask)
+            while new_ids[slot] != -1:
+                slot = (slot + 1) & mask
+            new_keys[slot] = table_keys[i]
+            new_ids[slot] = table_ids[i]
+    return new_keys, new_ids
+
+
+def _parse_raw_edgelist_chunk(chunk, delimiter, comments, lineno):
+    """Parse the first two columns of each row as strings, with the C reader of :func:`numpy.loadtxt`."""
+    try:
+        edges = _loadtxt_chunk(chunk, delimiter, comments, str).astype(str, copy=False)
+    except ValueError:
+        _raise_malformed_row(chunk, delimiter, comments, lineno, str)
+        raise
+    if delimiter != " ":
+        edges = np.char.strip(edges)
+    if np.any(edges == ""):
+        _raise_malformed_row(chunk, delimiter, comments, lineno, str)
+    return edges
+
+
+def _detect_delimiter(chunk, comments, lineno):
+    """Return ``" "`` (any whitespace) or ``","``, whichever splits the first row of ``chunk`` into integers."""
+    for ind, line in enumerate(chunk.splitlines()):
+        line = _strip_comments(line, comments)
+        if not line:
+            continue
+        for delimiter in [" ", ","]:
+            try:
+                _parse_row(line, delimiter)
+            except (ValueError, IndexError):
+                continue
+            return delimiter
+        raise ValueError(
+            "[ERROR] Tried delimiters ' ', '\\t', and ',', but none work for line {}: {}".format(lineno + ind + 1, line)
+        )
+    return None
+
+
+def _parse_edgelist_chunk(chunk, delimiter, comments, lineno, dtype):
+    """Parse the first two columns of each row as integers, with the C reader of :func:`numpy.loadtxt`."""
+    try:
+        edges = _loadtxt_chunk(chunk, delimiter, comments, np.int64)
+    except (ValueError, OverflowError):
+        _raise_malformed_row(chunk, delimiter, comments, lineno)
+        raise
+    return edges.astype(dtype, copy=False)
+
+
+def _loadtxt_chunk(chunk, delimiter, comments, dtype):
+    with warnings.catch_warnings():
+        # a chunk with only comments or blank lines is not an error
+        warnings.simplefilter("ignore", UserWarning)
+        edges = np.loadtxt(
+            io.StringIO(chunk), dtype=dtype, comments=comments, delimiter=None if delimiter == " " else delimiter,
+            usecols=(0, 1), ndmin=2
+        )
+    return edges.reshape(-1, 2)
+
+
+def _raise_malformed_row(chunk, delimiter, comments, lineno, dtype=int):
+    """Raise a ``ValueError`` with the line number of the first row of ``chunk`` that does not start with two
+    non-empty values of type ``dtype``; the slow path, only taken once parsing has failed."""
+    for ind, line in enumerate(chunk.splitlines()):
+        line = _strip_comments(line, comments)
+        if not line:
+            continue
+        try:
+            _parse_row(line, delimiter, dtype)
+        except (ValueError, IndexError):
+            raise ValueError("[ERROR] Malformed row at line {}: {}".format(lineno + ind + 1, line))
+
+
+def _strip_comments(line, comments):
+    if comments is not None:
+        line = line.split(comments, 1)[0]
+    return line.strip()
+
+
+def _parse_row(line, delimiter, dtype=int):
+    edge = line.split() if delimiter == " " else [_.strip() for _ in line.split(delimiter)]
+    if not edge[0] or not edge[1]:
+        raise ValueError("[ERROR] Empty column: {}".format(line))
+    return dtype(edge[0]), dtype(edge[1])
 
 
 def get_types(f_types):
@@ -73,6 +353,114 @@ def get_types(f_types):
     return np.array(types, dtype=np.int_)
 
 
+def save_graph(path, edgelist, types, node_ids=None):
+    """Save a bipartite graph in the native binary format.
+
+    The graph is stored as an uncompressed ``.npz`` archive with the arrays ``edgelist``, ``types``, ``header``
+    (i.e., :math:`n_a`, :math:`n_b`, and :math:`E`) and, optionally, ``node_ids``. Since the arrays are not
+    compressed, :func:`load_graph` can memory-map them directly from the archive.
+
+    Parameters
+    ----------
+    path : ``str``
+        File path to save to; the ``.npz`` extension is appended if it is missing.
+
+    edgelist : :class:`numpy.ndarray`
+        Integer array of shape ``(E, 2)``.
+
+    types : ``iterable``
+        Types of each node (``1`` or ``2``).
+
+    node_ids : ``iterable`` (optional, default: ``None``)
+        Original identifiers (integers or strings) of each node, e.g., the ``new2old`` mapping of a relabelled graph.
+
+    """
+    edgelist = np.asarray(edgelist)
+    assert edgelist.ndim == 2 and edgelist.shape[1] == 2, "[ERROR] edgelist should be of shape (E, 2)"
+    assert edgelist.dtype.kind in "iu", "[ERROR] edgelist should be an integer array; here it is {}".format(
+        edgelist.dtype)
+    types = np.asarray(types).astype(np.int8)
+    assert np.all((types == 1) | (types == 2)), "[ERROR] types should only contain 1 (type-a) or 2 (type-b)"
+    arrays = dict(
+        edgelist=np.ascontiguousarray(edgelist),
+        types=types,
+        header=np.array([np.sum(types == 1), np.sum(types == 2), len(edgelist)], dtype=np.int64)
+    )
+    if node_ids is not None:
+        node_ids = np.asarray(node_ids)
+        if node_ids.dtype.kind == "O":
+            node_ids = node_ids.astype(str)
+        assert len(node_ids) == len(types), "[ERROR] there should be one node id per node"
+        arrays["node_ids"] = node_ids
+    np.savez(path, **arrays)
+
+
+def load_graph(path, mmap_mode="r"):
+    """Load a bipartite graph saved by :func:`save_graph`.
+
+    Parameters
+    ----------
+    path : ``str``
+        The ``.npz`` file.
+
+    mmap_mode : ``str`` (optional, default: ``"r"``)
+        If not ``None``, memory-map the arrays from the archive with this mode (see :class:`numpy.memmap`), instead
+        of reading them into memory. :class:`biSBM.OptimalKs` uses a memory-mapped 64-bit edgelist without copying it.
+
+    Returns
+    -------
+    graph : ``dict``
+        With keys ``edgelist``, ``types``, ``node_ids`` (``None`` if not saved), ``na``, ``nb``, and ``e``.
+
+    Examples
+    --------
+    >>> from biSBM.ioutils import save_graph, load_graph
+    >>> save_graph("graph.npz", edgelist, types)
+    >>> graph = load_graph("graph.npz")
+    >>> oks = OptimalKs(engine, graph["edgelist"], graph["types"])
+
+    """
+    if mmap_mode is None:
+        with np.load(path) as f:
+            arrays = {key: f[key] for key in f.files}
+    else:
+        arrays = _memmap_npz(path, mmap_mode)
+    na, nb, e = (int(_) for _ in arrays["header"])
+    return dict(
+        edgelist=arrays["edgelist"],
+        types=arrays["types"],
+        node_ids=arrays.get("node_ids"),
+        na=na,
+        nb=nb,
+        e=e
+    )
+
+
+def _memmap_npz(path, mmap_mode):
+    """Memory-map each (uncompressed) array of a ``.npz`` archive."""
+    arrays = dict()
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            assert info.compress_type == zipfile.ZIP_STORED, "[ERROR] {} is compressed in {}".format(
+                info.filename, path)
+            # skip the local file header, whose fields may differ from the central directory
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            key = info.filename[:-len(".npy")]
+            if np.prod(shape) == 0:
+                arrays[key] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[key] = np.memmap(path, dtype=dtype, mode=mmap_mode, offset=f.tell(), shape=shape,
+                                        order="F" if fortran_order else "C")
+    return arrays
+
+
 def save_mb_to_file(path, mb):
     """Save the group membership list to a file path.
 
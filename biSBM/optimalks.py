@@ -1,10 +1,18 @@
 import os
+import time
+import shutil
+import hashlib
+import inspect
 import logging
 import tempfile
 import random
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from functools import partial
 
 from biSBM.utils import *
+from biSBM.bookkeeping import ArrayStore, Checkpoint, MemoryBudget, ResultCache, pack_array, unpack_array
 
 
 class OptimalKs(object):
@@ -16,7 +24,8 @@ class OptimalKs(object):
         The inference engine class.
 
     edgelist : ``iterable`` or :class:`numpy.ndarray`, required
-        Edgelist (bipartite network) for model selection.
+        Edgelist (bipartite network) for model selection. A 64-bit integer array (e.g., memory-mapped by
+        :func:`biSBM.ioutils.load_graph`) is used as is, without copying.
 
     types : ``iterable`` or :class:`numpy.ndarray`, required
         Types of each node specifying the type membership.
@@ -40,7 +49,19 @@ class OptimalKs(object):
         The directory entry for generated temporary network data, which will be removed immediately after the
         class is deleted. If ``tempdir`` is unset or ``None``, we will search for a standard list of directories
         and sets tempdir to the first one which the calling user can create files in, as :func:`tempfile.gettempdir`
-        dictates. We will pass the file to the inference :mod:`engines`.
+        dictates. We will pass the file to the inference :mod:`engines`. Engines that run in-process and in parallel
+        receive the arrays memory-mapped from ``.npy`` files in a sub-directory instead, which is also removed.
+
+    q_cache_dir : ``str`` (optional, default: ``None``)
+        Directory where the look-up table of :math:`\\log q(n, k)` is saved once and memory-mapped by later runs (and by
+        the parallel workers). If ``None``, the ``BISBM_CACHE_DIR`` environment variable is used, if it is set;
+        otherwise the table is filled lazily in memory. See :func:`biSBM.int_part.init_q_cache`.
+
+    seed : ``int`` or :class:`numpy.random.Generator` (optional, default: ``None``)
+        Seed of the heuristic, and of the engines (if their ``engine`` method takes a ``seed``). Each engine call,
+        including those of the parallel workers, draws from its own stream, spawned from the seed, :math:`(K_a, K_b)`,
+        and the index of the call, so that the results do not depend on the scheduling of the tasks. If ``None``, the
+        seed is drawn from the global :mod:`numpy.random` state.
 
     """
 
@@ -52,13 +73,17 @@ class OptimalKs(object):
                  default_args=True,
                  random_init_k=False,
                  bipartite_prior=True,
-                 tempdir=None):
+                 tempdir=None,
+                 q_cache_dir=None,
+                 seed=None):
 
         self.engine_ = engine.engine  # TODO: check that engine is an object
         self.max_n_sweeps_ = engine.MAX_NUM_SWEEPS
         self.is_par_ = engine.PARALLELIZATION
         self.n_cores_ = engine.NUM_CORES
         self.algm_name_ = engine.ALGM_NAME
+        self.is_in_memory_ = getattr(engine, "IN_MEMORY", False)
+        self._engine_takes_seed = "seed" in inspect.signature(engine.engine).parameters
         self._virgin_run = True
 
         self.bm_state = dict()
@@ -77,7 +102,11 @@ class OptimalKs(object):
             elif _type in ["2", 2]:
                 self.bm_state["n_b"] += 1
 
-        self.edgelist = np.array(edgelist, dtype=np.uint64)
+        if isinstance(edgelist, np.ndarray) and edgelist.dtype in [np.int64, np.uint64]:
+            # e.g., memory-mapped by `load_graph`; no need to copy
+            self.edgelist = edgelist
+        else:
+            self.edgelist = np.array(edgelist, dtype=np.uint64)
         self.bm_state["e"] = len(self.edgelist)
         self.i_0s = []
         if engine.ALGM_NAME == "mcmc" and default_args:
@@ -97,9 +126,16 @@ class OptimalKs(object):
         else:
             self.bm_state["ka"] = self.bm_state["kb"] = self.i_0 = \
                 self.adaptive_ratio = self._k_th_nb_to_search = self._nm = None
+        self._exhaustive_merge_max_k = 0
+        self._batch_nb_search = False
+        # the heuristic draws from `_rng`; the engine calls are seeded by `_spawn_seeds`
+        self._seed = int(get_rng(seed).integers(2 ** 63)) if seed is None or isinstance(
+            seed, np.random.Generator) else int(seed)
+        self._rng = np.random.default_rng(self._seed)
+        self._n_runs = dict()
         if random_init_k:
-            self.bm_state["ka"] = np.random.randint(1, self.bm_state["ka"] + 1)
-            self.bm_state["kb"] = np.random.randint(1, self.bm_state["kb"] + 1)
+            self.bm_state["ka"] = int(self._rng.integers(1, self.bm_state["ka"] + 1))
+            self.bm_state["kb"] = int(self._rng.integers(1, self.bm_state["kb"] + 1))
 
         # Description Length (dl), e_rs matrix, and partition (mb) are book-kept
         self.bookkeeping_dl = OrderedDict()
@@ -113,13 +149,39 @@ class OptimalKs(object):
         # for debug/temp variables
         self.tempdir = tempdir
 
+        # budget of `minimize_bisbm_dl`; see `_charge`
+        self._set_budget()
+
+        # time spent in each phase, and counters; see `summary()["profile"]` and `set_profile_callback`
+        self._profile = _new_profile()
+        self._profile_callback = None
+
+        # engine evaluations are appended to `_checkpoint`, and those of `_journal` are replayed; see `resume`
+        self._checkpoint = None
+        self._checkpoint_started = False
+        self._journal = deque()
+
+        # engine results shared with other instances; see `set_result_cache`
+        self._result_cache = None
+        self._result_cache_seed = None
+        self._graph_hash = None
+
+        # arrays handed to the loky workers by name; see `_get_shared_edgelist`
+        self._shared_dir = None
+        self._shared_edgelist = None
+        self._shared_mb = dict()
+
         self.__del__no_call = True
-        if self.is_par_:
-            # To prevent "TypeError: cannot serialize '_io.TextIOWrapper' object" when using loky
-            self.f_edgelist = tempfile.NamedTemporaryFile(mode='w+b', dir=tempdir, delete=False)
+        if self.is_in_memory_:
+            # the engine works on the edgelist array directly
+            self._f_edgelist_name = None
         else:
-            self.f_edgelist = tempfile.NamedTemporaryFile(mode='w+b', dir=tempdir, delete=True)
-        self._f_edgelist_name = self._get_tempfile_edgelist()
+            if self.is_par_:
+                # To prevent "TypeError: cannot serialize '_io.TextIOWrapper' object" when using loky
+                self.f_edgelist = tempfile.NamedTemporaryFile(mode='w+b', dir=tempdir, delete=False)
+            else:
+                self.f_edgelist = tempfile.NamedTemporaryFile(mode='w+b', dir=tempdir, delete=True)
+            self._f_edgelist_name = self._get_tempfile_edgelist()
 
         # logging
         if verbose:
@@ -139,18 +201,31 @@ class OptimalKs(object):
 
         # look-up tables
         self.__q_cache_max_e_r = self.bm_state["e"] if self.bm_state["e"] <= int(1e4) else int(1e4)
-        self.__q_cache = init_q_cache(self.__q_cache_max_e_r)
+        self.__q_cache = init_q_cache(self.__q_cache_max_e_r, cache_dir=q_cache_dir)
 
         self.bipartite_prior_ = bipartite_prior
 
-    def minimize_bisbm_dl(self, bipartite_prior=True):
+    def minimize_bisbm_dl(self, bipartite_prior=True, max_time=None, max_engine_calls=None, max_dl_evals=None):
         """Fit the bipartite stochastic block model, by minimizing its description length using an agglomerative
         heuristic.
 
+        The search can be bounded by a budget. It is checked before each evaluation of the description length at a new
+        :math:`(K_a, K_b)`; if the evaluation would exceed it, the search stops (with ``("budget", ka, kb)`` as the last
+        entry of ``trace_k``), and :func:`summary` returns the best point so far.
+
         Parameters
         ----------
         bipartite_prior : ``bool`` (optional, default ``True``)
 
+        max_time : ``float`` (optional, default: ``None``)
+            Wall-clock budget, in seconds. An evaluation that has started is not interrupted.
+
+        max_engine_calls : ``int`` (optional, default: ``None``)
+            Maximal number of calls of the engine (i.e., ``n_sweeps`` per evaluation).
+
+        max_dl_evals : ``int`` (optional, default: ``None``)
+            Maximal number of evaluations of the description length at a new :math:`(K_a, K_b)`.
+
         Returns
         -------
         OptimalKs.bookkeeping_dl : :py:class:`collections.OrderedDict`
@@ -162,39 +237,103 @@ class OptimalKs(object):
         """
         self.bipartite_prior_ = bipartite_prior
         self._prerunning_checks()
+        self._set_budget(max_time, max_engine_calls, max_dl_evals)
 
-        self._compute_dl_and_update(1, 1)
-        if self.algm_name_ == "mcmc" and self._virgin_run:
-            self._natural_merge()
-
-        if self._check_if_local_minimum(self.bm_state["ka"], self.bm_state["kb"]):
-            self.trace_k += [("mdl", self.bm_state["ka"], self.bm_state["kb"])]
-            return self.bookkeeping_dl
-        else:
-            dS = 0.
-            while abs(dS) < self.i_0 * self.bm_state["ref_dl"]:
-                ka, kb = self.bm_state["ka"], self.bm_state["kb"]
-                self.trace_k += [("merge_or_rollback", ka, kb)]
-                if ka * kb != 1:
-                    ka_, kb_, dS, mlist = self._merge_e_rs(ka, kb)
-                    if self._determine_i_0(dS):
-                        ka__, kb__, _ = self.summary(mode="simple")
-                        self._logger.info(
-                            f"Tried {(ka, kb)} ~~-> {(ka_, kb_)}, "
-                            f"but *DL{(ka_, kb_)} deviates too much from *DL{(ka__, kb__)}, "
-                            f"which is {dS}."
-                        )
-                        break
-                    mb_ = accept_mb_merge(self.bm_state["mb"], mlist)
-                    e_rs = assemble_e_rs_from_mb(self.edgelist, mb_)
-                    self._update_bm_state(ka_, kb_, e_rs, mb_, record_merge=True)
-                    self._logger.info(f"{(ka, kb)} ~~-> {(ka_, kb_)}")
-                else:
+        try:
+            while True:
+                self._compute_dl_and_update(1, 1)
+                if self.algm_name_ == "mcmc" and self._virgin_run:
+                    self._natural_merge()
+
+                with self._timed("neighbor_check"):
+                    is_local_minimum = self._check_if_local_minimum(self.bm_state["ka"], self.bm_state["kb"])
+                if is_local_minimum:
+                    self.trace_k += [("mdl", self.bm_state["ka"], self.bm_state["kb"])]
                     break
-            ka, kb = self.bm_state["ka"], self.bm_state["kb"]
-            self.trace_k += [("escape_to", ka, kb)]
-            self._logger.info(f"Escape the loop of agglomerative merges. Now {(ka, kb)} looks suspicious.")
-            return self.minimize_bisbm_dl(bipartite_prior=self.bipartite_prior_)
+                dS = 0.
+                while abs(dS) < self.i_0 * self.bm_state["ref_dl"]:
+                    ka, kb = self.bm_state["ka"], self.bm_state["kb"]
+                    self.trace_k += [("merge_or_rollback", ka, kb)]
+                    if ka * kb != 1:
+                        with self._timed("merge"):
+                            ka_, kb_, dS, mlist = self._merge_e_rs(ka, kb)
+                        if self._determine_i_0(dS):
+                            ka__, kb__, _ = self.summary(mode="simple")
+                            self._logger.info(
+                                f"Tried {(ka, kb)} ~~-> {(ka_, kb_)}, "
+                                f"but *DL{(ka_, kb_)} deviates too much from *DL{(ka__, kb__)}, "
+                                f"which is {dS}."
+                            )
+                            break
+                        with self._timed("merge"):
+                            # O(K) per merge; the membership vector is only materialized when it is read
+                            mb_ = MergedPartition.from_mb(self.bm_state["mb"]).merge(mlist)
+                            e_rs = accept_e_rs_merge(self.bm_state["e_rs"], mlist)
+                            self._update_bm_state(ka_, kb_, e_rs, mb_, record_merge=True)
+                        self._profile["merges"] += 1
+                        self._logger.info(f"{(ka, kb)} ~~-> {(ka_, kb_)}")
+                    else:
+                        break
+                ka, kb = self.bm_state["ka"], self.bm_state["kb"]
+                self.trace_k += [("escape_to", ka, kb)]
+                self._logger.info(f"Escape the loop of agglomerative merges. Now {(ka, kb)} looks suspicious.")
+        except _BudgetExhausted as e:
+            if len(self.bookkeeping_dl) == 0:
+                self._logger.warning(f"{e} No point was evaluated.")
+            else:
+                ka, kb, _ = self.summary(mode="simple")
+                self.trace_k += [("budget", ka, kb)]
+                self._logger.warning(f"{e} Stop at the best point so far, {(ka, kb)}.")
+        return self.bookkeeping_dl
+
+    def resume(self, path, max_time=None, max_engine_calls=None, max_dl_evals=None):
+        """Continue :func:`minimize_bisbm_dl` from the checkpoint written to ``path`` (see :func:`set_checkpoint`).
+
+        The heuristic restarts with the parameters that it was started with, but the engine evaluations found in the
+        checkpoint are replayed instead of computed, along with the states of the random number generators after
+        each of them. Hence, the search takes the same path up to the last completed evaluation, and continues from
+        there. The new evaluations are appended to the same checkpoint.
+
+        Parameters
+        ----------
+        path : ``str``
+
+        max_time : ``float`` (optional, default: ``None``)
+
+        max_engine_calls : ``int`` (optional, default: ``None``)
+
+        max_dl_evals : ``int`` (optional, default: ``None``)
+            The budget of the resumed search (see :func:`minimize_bisbm_dl`); replayed evaluations are free.
+
+        Returns
+        -------
+        OptimalKs.bookkeeping_dl : :py:class:`collections.OrderedDict`
+
+        """
+        checkpoint = Checkpoint(path)
+        params, records = checkpoint.read()
+        assert (params["n_a"], params["n_b"], params["e"]) == (self.bm_state["n_a"], self.bm_state["n_b"],
+                                                               self.bm_state["e"]), \
+            "[ERROR] The checkpoint {} is of another network.".format(path)
+        self._set_search_params(params)
+        self.bookkeeping_dl.clear()
+        self.bookkeeping_e_rs.clear()
+        for kind in ["mcmc", "merge", "order"]:
+            self.bookkeeping_mb[kind].clear()
+        self.trace_k = []
+        self.i_0s = []
+        self.bm_state["ref_dl"] = 0
+        self.bm_state["e_rs"] = None
+        self.bm_state["mb"] = list()
+        self._shared_mb = dict()
+        self._n_runs = dict()
+
+        self._journal = deque(records)
+        self._checkpoint = checkpoint
+        self._checkpoint_started = True
+        self._logger.info(f"Resume from {len(records)} evaluations in the checkpoint {path}.")
+        return self.minimize_bisbm_dl(bipartite_prior=params["bipartite_prior"], max_time=max_time,
+                                      max_engine_calls=max_engine_calls, max_dl_evals=max_dl_evals)
 
     def summary(self, mode=None):
         """Return a summary of the algorithmic outcome.
@@ -202,7 +341,8 @@ class OptimalKs(object):
         Returns
         -------
         OptimalKs._summary : ``dict``
-            A summary of the algorithmic outcome with minimal description length (in nats).
+            A summary of the algorithmic outcome with minimal description length (in nats). Its ``"profile"`` entry
+            is a copy of :func:`get_profile`.
 
         """
         ka, kb = sorted(self.bookkeeping_dl, key=self.bookkeeping_dl.get)[0]
@@ -214,6 +354,7 @@ class OptimalKs(object):
         self._summary["kb"] = kb
         self._summary["dl"] = self.summary_dl(ka, kb)
         del self._summary["dl"]["dl"]
+        self._summary["profile"] = self.get_profile()
 
         return self._summary
 
@@ -285,45 +426,67 @@ class OptimalKs(object):
         except KeyError as _:
             pass
         else:
-            if self.bookkeeping_dl[(ka, kb)] > 0:
+            # the partition may have been evicted from a bounded bookkeeping; see `set_bookkeeping`
+            if self.bookkeeping_dl[(ka, kb)] > 0 and (ka, kb) in self.bookkeeping_mb["mcmc"] and \
+                    (ka, kb) in self.bookkeeping_e_rs:
+                self._profile["cache_hits"] += 1
                 _ = ka, kb
                 return self.bookkeeping_dl[_], self.bookkeeping_e_rs[_], self.bookkeeping_mb["mcmc"][_]
         na, nb, e = self.bm_state["n_a"], self.bm_state["n_b"], self.bm_state["e"]
         if ka == 1 and kb == 1:
+            self._charge(0)
             mb = np.array([0] * na + [1] * nb, dtype=np.int_)
             res = self._compute_desc_len(na, nb, e, ka, kb, mb)
             return res[0], res[1], res[2]
 
-        if not recompute:
-            ka_ = self._summary["algm_args"]["init_ka"]
-            kb_ = self._summary["algm_args"]["init_kb"]
-            na = self._summary["na"]
-            nb = self._summary["nb"]
-            dist = np.sqrt((ka_ - ka) ** 2 + (kb_ - kb) ** 2)
-            if dist <= self._k_th_nb_to_search * np.sqrt(2):
-                self._logger.info(f"({na}, {nb}) ~~-> ({ka}, {kb}); Use that partition to start MCMC@({ka}, {kb}).")
-                _mb = None
-            else:
-                self._logger.info(f"({ka_}, {kb_}) ~~-> ({ka}, {kb}); Use that partition to start MCMC@({ka}, {kb}).")
-                _mb = self.bookkeeping_mb["mcmc"][(ka_, kb_)]
-        else:
-            _mb = None
-
-        def run(a, b):
-            return self.engine_(self._f_edgelist_name, na, nb, a, b, mb=_mb)
-
+        run, seeds = self._spawn_seeds(ka, kb)
+        replayed = self._replay(ka, kb)
+        if replayed is not None:
+            return replayed
+        init_k = None if recompute else self._get_init_k(ka, kb)
+        cached = None if recompute else self._get_cached_result(ka, kb, run, init_k)
+        if cached is not None:
+            return self._save_checkpoint(ka, kb, cached)
+        self._charge(self.max_n_sweeps_)
         # Calculate the biSBM inference several times,
         # choose the maximum likelihood (or minimum entropy) result.
         results = []
         if self.is_par_:
-            # automatically shutdown after idling for 600s
+            # the tasks only carry the names of the shared arrays; automatically shutdown after idling for 600s
+            engine = partial(_run_engine, self.engine_, self._get_shared_edgelist(), na, nb, ka, kb,
+                             self._get_shared_mb(init_k))
             self.__del__no_call = True
-            results = list(loky_executor(self.n_cores_, 600, lambda x: run(ka, kb), list(range(self.max_n_sweeps_))))
-            self.__del__no_call = False
+            try:
+                with self._timed("engine", len(seeds)):
+                    results = list(loky_executor(self.n_cores_, 600, engine, seeds))
+            finally:
+                self.__del__no_call = False
+        else:
+            _mb = None if init_k is None else self.bookkeeping_mb["mcmc"][init_k]
+            with self._timed("engine", len(seeds)):
+                for seed in seeds:
+                    results += [_run_engine(self.engine_, self._get_engine_edgelist(), na, nb, ka, kb, _mb, seed)]
+
+        return self._save_checkpoint(ka, kb, self._cache_result(ka, kb, run, self._min_desc_len(ka, kb, results),
+                                                                init_k))
+
+    def _get_init_k(self, ka, kb):
+        """Return the point whose partition is used to start the engine at :math:`(K_a, K_b)`, or ``None`` if it
+        should start from scratch."""
+        ka_ = self._summary["algm_args"]["init_ka"]
+        kb_ = self._summary["algm_args"]["init_kb"]
+        na = self._summary["na"]
+        nb = self._summary["nb"]
+        dist = np.sqrt((ka_ - ka) ** 2 + (kb_ - kb) ** 2)
+        if dist <= self._k_th_nb_to_search * np.sqrt(2):
+            self._logger.info(f"({na}, {nb}) ~~-> ({ka}, {kb}); Use that partition to start MCMC@({ka}, {kb}).")
+            return None
         else:
-            for _ in range(self.max_n_sweeps_):
-                results += [run(ka, kb)]
+            self._logger.info(f"({ka_}, {kb_}) ~~-> ({ka}, {kb}); Use that partition to start MCMC@({ka}, {kb}).")
+            return ka_, kb_
 
+    def _min_desc_len(self, ka, kb, results):
+        na, nb, e = self.bm_state["n_a"], self.bm_state["n_b"], self.bm_state["e"]
         result_ = [self._compute_desc_len(na, nb, e, ka, kb, r) for r in results]
         result = min(result_, key=lambda x: x[0])
         dl = result[0]
@@ -334,20 +497,32 @@ class OptimalKs(object):
     def natural_merge(self):
         """Phase 1 natural e_rs-block merge"""
         na, nb, e = self.bm_state["n_a"], self.bm_state["n_b"], self.bm_state["e"]
-
-        def run(_):
-            # Note: setting (ka, kb) = (1, 1) is redundant.
-            return self.engine_(self._f_edgelist_name, na, nb, 1, 1, mb=None, method="natural")
-
+        run, seeds = self._spawn_seeds(None, None)
+        replayed = self._replay(None, None)
+        if replayed is not None:
+            return replayed
+        cached = self._get_cached_result(None, None, run)
+        if cached is not None:
+            return self._save_checkpoint(None, None, cached)
+        self._charge(self.max_n_sweeps_)
+
+        # Note: setting (ka, kb) = (1, 1) is redundant.
         results = []
         if self.is_par_:
             # automatically shutdown after idling for 600s
+            engine = partial(_run_engine, self.engine_, self._get_shared_edgelist(), na, nb, 1, 1, None,
+                             method="natural")
             self.__del__no_call = True
-            results = list(loky_executor(self.n_cores_, 600, lambda x: run(0), list(range(self.max_n_sweeps_))))
-            self.__del__no_call = False
+            try:
+                with self._timed("engine", len(seeds)):
+                    results = list(loky_executor(self.n_cores_, 600, engine, seeds))
+            finally:
+                self.__del__no_call = False
         else:
-            for _ in range(self.max_n_sweeps_):
-                results += [run(0)]
+            with self._timed("engine", len(seeds)):
+                for seed in seeds:
+                    results += [_run_engine(self.engine_, self._get_engine_edgelist(), na, nb, 1, 1, None, seed,
+                                            method="natural")]
 
         result_ = [self._compute_desc_len(na, nb, e, r[0], r[1], r[2:]) for r in results]
         result = min(result_, key=lambda x: x[0])
@@ -355,7 +530,8 @@ class OptimalKs(object):
         e_rs = result[1]
         mb = result[2]
         ka, kb = result[3]
-        return dl, e_rs, mb, ka, kb, na, nb
+        return self._save_checkpoint(None, None,
+                                     self._cache_result(None, None, run, (dl, e_rs, mb, ka, kb, na, nb)))
 
     def _natural_merge(self):
         dl, e_rs, mb, ka, kb, na, nb = self.natural_merge()
@@ -386,10 +562,12 @@ class OptimalKs(object):
             return False
 
     def _compute_desc_len(self, n_a, n_b, e, ka, kb, mb):
-        e_rs = assemble_e_rs_from_mb(self.edgelist, mb)
-        nr = assemble_n_r_from_mb(mb)
-        desc_len = get_desc_len_from_data(n_a, n_b, e, ka, kb, self.edgelist, mb, nr=nr, q_cache=self.__q_cache,
-                                          is_bipartite=self.bipartite_prior_)
+        with self._timed("dl"):
+            e_rs = assemble_e_rs_from_mb(self.edgelist, mb)
+            nr = assemble_n_r_from_mb(mb)
+            desc_len = get_desc_len_from_data(n_a, n_b, e, ka, kb, self.edgelist, mb, nr=nr,
+                                              q_cache=self.__q_cache, is_bipartite=self.bipartite_prior_)
+        self._profile["dl_evals"] += 1
         return desc_len, e_rs, mb, (ka, kb)
 
     def _merge_e_rs(self, ka, kb):
@@ -417,18 +595,10 @@ class OptimalKs(object):
             The two row-indexes of the original affinity matrix that were finally chosen (and merged)
 
         """
-        m = np.arange(ka + kb)
-
-        mlists = set()
-        while len(mlists) == 0:
-            for _m in m:
-                pool = random.choices(m, k=self._nm)
-                _mlist = [[min(x, _m), max(x, _m)] for x in pool]
-                for _ in _mlist:
-                    cond = (_[0] != _[1]) and not (_[1] >= ka > _[0]) and not (_[0] == 0 and ka == 1) and not (
-                            _[0] == ka and kb == 1)
-                    if cond:
-                        mlists.add(str(_[0]) + "+" + str(_[1]))
+        if ka + kb <= self._exhaustive_merge_max_k:
+            mlists = assemble_merge_candidates(ka, kb)
+        else:
+            mlists = assemble_merge_candidates(ka, kb, nm=self._nm, rng=self._rng)
 
         dS, _mlist = virtual_moves_ds(self.bm_state["e_rs"], mlists, self.bm_state["ka"])
         if np.max(_mlist) < self.bm_state["ka"]:
@@ -456,6 +626,9 @@ class OptimalKs(object):
 
     def _compute_dl_and_update(self, ka, kb, recompute=False):
         dl, e_rs, mb = self.compute_dl(ka, kb, recompute=recompute)
+        return self._record_dl(ka, kb, dl, e_rs, mb)
+
+    def _record_dl(self, ka, kb, dl, e_rs, mb):
         assert max(mb) + 1 == ka + kb, "[ERROR] inconsistency between mb. indexes and #blocks. {} != {}".format(
             max(mb) + 1, ka + kb)
         self.bookkeeping_dl[(ka, kb)] = dl
@@ -492,14 +665,21 @@ class OptimalKs(object):
             self._logger.info(f"Move to {(ka, kb)} and re-checking if it is a local minimum.")
 
         nb_points = self._get_neighbor_points(ka, kb)
+        if self._batch_nb_search:
+            results = self._compute_dl_in_batch(nb_points, _dl)
+        else:
+            results = (self.compute_dl(_ka, _kb) for _ka, _kb in nb_points)
 
-        for _ka, _kb in nb_points:
-            self._compute_dl_and_update(_ka, _kb)
-            if not self._is_mdl_so_far(_dl):
-                _, _, _, mdl = self._rollback()
-                self._logger.info(
-                    f"Warning. DL{(_ka, _kb)} = {mdl} < DL{(ka, kb)}. We move to {(_ka, _kb)} but NOT reduce \u0394.")
-                break
+        try:
+            for (_ka, _kb), (dl, e_rs, mb) in zip(nb_points, results):
+                self._record_dl(_ka, _kb, dl, e_rs, mb)
+                if not self._is_mdl_so_far(_dl):
+                    _, _, _, mdl = self._rollback()
+                    self._logger.info(
+                        f"Warning. DL{(_ka, _kb)} = {mdl} < DL{(ka, kb)}. We move to {(_ka, _kb)} but NOT reduce \u0394.")
+                    break
+        finally:
+            results.close()
 
         if _dl != self.summary(mode="simple")[2]:
             self._logger.info(f"Bummer. {(ka, kb)} is NOT a local minimum.")
@@ -508,6 +688,94 @@ class OptimalKs(object):
             self._logger.info(f"YES! {(ka, kb)} is a local minimum with DL = {_dl}. We are done.")
             return True
 
+    def _compute_dl_in_batch(self, points, dl_to_beat):
+        """Yield :func:`compute_dl` of each point in ``points``, in order, while all of them are submitted to the
+        executor at once.
+
+        Results are collected in completion order. As soon as a point has a description length lower than
+        ``dl_to_beat``, the search will stop there (or at an earlier point), so the points after it are cancelled.
+        Since the results are yielded in the order of ``points``, the trace does not depend on the completion order.
+        For the same reason, a point is charged to the budget, and counted in the profile, only when it is yielded,
+        and the run indices (hence the seeds) of the points that are not yielded are given back; the budget and the
+        seeds are then the same as in the serial search. The points that would not fit in the budget are not
+        submitted.
+
+        """
+        executor = get_reusable_executor(max_workers=self.n_cores_, timeout=600)
+        na, nb = self.bm_state["n_a"], self.bm_state["n_b"]
+        futures = dict()
+        results = dict()
+        runs = dict()
+        init_ks = dict()
+        cached = set()  # found in the result cache
+        computed = set()  # not book-kept yet, to be appended to the checkpoint
+        yielded = set()
+        last = len(points) - 1
+        n_submitted = 0
+        # the futures are submitted in the `try`, so that they are cancelled if anything goes wrong in the middle
+        self.__del__no_call = True
+        try:
+            for idx, (ka, kb) in enumerate(points):
+                if self.bookkeeping_dl.get((ka, kb), 0) > 0 or (ka, kb) == (1, 1):
+                    continue  # evaluated with `compute_dl` when it is its turn
+                runs[idx], seeds = self._spawn_seeds(ka, kb)
+                if self._journal and self._journal[0]["k"] == (ka, kb):
+                    results[idx] = self._replay(ka, kb)
+                    continue
+                init_ks[idx] = self._get_init_k(ka, kb)
+                result = self._get_cached_result(ka, kb, runs[idx], init_ks[idx])
+                if result is not None:
+                    results[idx] = result
+                    cached.add(idx)
+                    computed.add(idx)
+                    continue
+                try:
+                    self._check_budget(n_submitted + 1, (n_submitted + 1) * self.max_n_sweeps_)
+                except _BudgetExhausted:
+                    break  # `_charge` raises when it is the turn of this point
+                n_submitted += 1
+                # the sweeps of a point run one after another in its worker, and the description lengths are
+                # computed here, so that the tasks only carry the names of the shared arrays
+                future = executor.submit(_run_sweeps, self.engine_, self._get_shared_edgelist(), na, nb, ka, kb,
+                                         self._get_shared_mb(init_ks[idx]), seeds)
+                futures[future] = idx
+            for idx, (ka, kb) in enumerate(points):
+                if idx not in runs:
+                    yield self.compute_dl(ka, kb)
+                    continue
+                if idx not in results:
+                    self._charge(self.max_n_sweeps_)
+                    self._profile["engine_calls"] += self.max_n_sweeps_
+                while idx not in results:
+                    with self._timed("engine"):
+                        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        idx_ = futures.pop(future)
+                        results[idx_] = self._cache_result(*points[idx_], runs[idx_],
+                                                           self._min_desc_len(*points[idx_], future.result()),
+                                                           init_ks[idx_])
+                        computed.add(idx_)
+                        if results[idx_][0] < dl_to_beat and idx_ < last:
+                            last = idx_
+                            for future_, idx__ in futures.items():
+                                if idx__ > last:
+                                    future_.cancel()
+                            futures = {f: i for f, i in futures.items() if i <= last}
+                yielded.add(idx)
+                if idx in computed:
+                    yield self._save_checkpoint(ka, kb, results.pop(idx))
+                else:
+                    yield results.pop(idx)
+        finally:
+            for future in futures:
+                future.cancel()
+            # the points that are not yielded are not evaluated in the serial search
+            for idx in runs.keys() - yielded:
+                self._n_runs[tuple(int(_) for _ in points[idx])] = runs[idx]
+                if idx in cached:
+                    self._profile["result_cache_hits"] -= 1
+            self.__del__no_call = False
+
     def _get_neighbor_points(self, ka, kb):
         k_th = self._k_th_nb_to_search
         nb_points = [(x + ka, y + kb) for (x, y) in product(range(-k_th, k_th + 1), repeat=2)]
@@ -517,7 +785,7 @@ class OptimalKs(object):
         nb_points = [(i, j) for i, j in nb_points if na >= i >= 1 and nb >= j >= 1 and (i, j) != (ka, kb)]
         _ = sorted(nb_points, key=lambda x: x[0] - ka + x[1] - kb, reverse=True)
         nb_points = [_.pop(0), _.pop(-1)]
-        random.shuffle(_)
+        self._rng.shuffle(_)
         nb_points += _
         return nb_points
 
@@ -598,9 +866,287 @@ class OptimalKs(object):
         """Set the :math:`n_m` parameter (defaults to ``10``)."""
         self._nm = int(s)
 
+    def set_exhaustive_merge(self, k_max=0):
+        """Evaluate every pair of same-type blocks as a merge candidate, instead of :math:`n_m` random partners per
+        block, whenever :math:`K_a + K_b \\leq` ``k_max`` (defaults to ``0``, i.e., never)."""
+        self._exhaustive_merge_max_k = int(k_max)
+
+    def set_batch_neighbor_search(self, batch=True):
+        """Whether to submit all the neighbor points of the neighborhood search to the executor at once (with
+        ``n_cores`` workers), rather than computing them one after another (defaults to ``True``)."""
+        self._batch_nb_search = bool(batch)
+
+    def set_bookkeeping(self, max_bytes=None, spill_dir=None, compress=True):
+        """Keep the book-kept partitions and :math:`e_{rs}` matrices in the smallest integer dtype that fits and
+        compressed, within a memory budget (see :class:`biSBM.bookkeeping.ArrayStore`).
+
+        When the budget is exceeded, the entries are spilled to ``spill_dir``, or, if it is ``None``, evicted, starting
+        from the points of the highest description length. The best point so far, the point used to warm-start the
+        engines, and the current point are never evicted; an evicted point is recomputed if it is visited again.
+
+        Parameters
+        ----------
+        max_bytes : ``int`` (optional, default: ``None``)
+            Maximal number of bytes held in memory by the bookkeeping. If ``None``, there is no limit.
+
+        spill_dir : ``str`` (optional, default: ``None``)
+
+        compress : ``bool`` (optional, default: ``True``)
+
+        """
+        budget = MemoryBudget(max_bytes, spill_dir=spill_dir, protect=self._get_protected_points,
+                              rank=lambda k: self.bookkeeping_dl.get(k, np.inf))
+        self.bookkeeping_e_rs, items = ArrayStore(budget, compress=compress), self.bookkeeping_e_rs
+        self.bookkeeping_e_rs.update(items)
+        for kind in ["mcmc", "merge"]:
+            self.bookkeeping_mb[kind], items = ArrayStore(budget, compress=compress), self.bookkeeping_mb[kind]
+            self.bookkeeping_mb[kind].update(items)
+
+    def set_checkpoint(self, path):
+        """Append each completed engine evaluation of :func:`minimize_bisbm_dl`, and the states of the random number
+        generators after it, to a new checkpoint file ``path``; use :func:`resume` to continue from it after an
+        interruption. The partitions and :math:`e_{rs}` matrices are saved in the smallest integer dtype that fits,
+        and compressed. This should be set before :func:`minimize_bisbm_dl` is called."""
+        self._checkpoint = Checkpoint(path)
+        self._checkpoint_started = False
+
+    def get_profile(self):
+        """Return the time spent in each phase of the heuristic, and its counters, since the instance was created.
+
+        Returns
+        -------
+        profile : ``dict``
+            ``"time"`` maps each phase to its wall-clock time, in seconds: ``"engine"`` (the engine calls, or waiting
+            for them), ``"dl"`` (the description lengths of their partitions), ``"merge"`` (the agglomerative merges)
+            and ``"neighbor_check"`` (the neighborhood searches, *including* the engine calls and description lengths
+            that they trigger). The counters are ``"engine_calls"``, ``"dl_evals"``, ``"merges"``,
+            ``"neighbor_checks"``, ``"cache_hits"`` (points of :func:`compute_dl` found in the bookkeeping),
+            ``"result_cache_hits"`` (see :func:`set_result_cache`), ``"replays"`` (see :func:`resume`), and
+            ``"tempfile_bytes"``, the number of bytes of the network and partitions written to temporary files
+            for the engines (files written by the engines themselves are not counted).
+
+        """
+        profile = dict(self._profile)
+        profile["time"] = dict(self._profile["time"])
+        return profile
+
+    def set_profile_callback(self, callback=None):
+        """Call ``callback(phase, seconds, profile)`` each time a phase of the heuristic (see :func:`get_profile`)
+        ends, with its wall-clock time and a copy of the profile so far; e.g., to stream the metrics of a long fit.
+        ``None`` removes the callback."""
+        self._profile_callback = callback
+
+    @contextmanager
+    def _timed(self, phase, engine_calls=0):
+        """Add the wall-clock time of the block to ``phase``, and ``engine_calls`` to the number of engine calls."""
+        t_0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t_0
+            self._profile["time"][phase] += dt
+            self._profile["engine_calls"] += engine_calls
+            if phase == "neighbor_check":
+                self._profile["neighbor_checks"] += 1
+            if self._profile_callback is not None:
+                self._profile_callback(phase, dt, self.get_profile())
+
+    def _set_budget(self, max_time=None, max_engine_calls=None, max_dl_evals=None):
+        self._deadline = None if max_time is None else time.monotonic() + max_time
+        self._max_engine_calls = max_engine_calls
+        self._max_dl_evals = max_dl_evals
+        self._n_engine_calls = 0
+        self._n_dl_evals = 0
+
+    def _charge(self, engine_calls):
+        """Account for an evaluation of the description length, with ``engine_calls`` calls of the engine, or raise
+        :class:`_BudgetExhausted` if it does not fit in the budget."""
+        self._check_budget(1, engine_calls)
+        self._n_dl_evals += 1
+        self._n_engine_calls += engine_calls
+
+    def _check_budget(self, dl_evals, engine_calls):
+        """Raise :class:`_BudgetExhausted` if ``dl_evals`` more evaluations, with ``engine_calls`` more calls of the
+        engine, do not fit in the budget."""
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            raise _BudgetExhausted("The wall-clock budget is used up.")
+        if self._max_dl_evals is not None and self._n_dl_evals + dl_evals > self._max_dl_evals:
+            raise _BudgetExhausted(f"The budget of {self._max_dl_evals} evaluations is used up.")
+        if self._max_engine_calls is not None and self._n_engine_calls + engine_calls > self._max_engine_calls:
+            raise _BudgetExhausted(f"The budget of {self._max_engine_calls} engine calls is used up.")
+
+    def _save_checkpoint(self, ka, kb, result):
+        """Append ``result``, i.e., the output of the evaluation at :math:`(K_a, K_b)` (``(None, None)`` for the natural
+        merge), to the checkpoint, if any, and return it."""
+        if self._checkpoint is None:
+            return result
+        if not self._checkpoint_started:
+            self._checkpoint.start(self._get_search_params())
+            self._checkpoint_started = True
+        self._checkpoint.append({
+            "k": (ka, kb), "result": _pack_result(result), "rng": self._rng.bit_generator.state,
+            "np_random": np.random.get_state(), "random": random.getstate()
+        })
+        return result
+
+    def _replay(self, ka, kb):
+        """Return the result of the next evaluation in the journal, if it is at :math:`(K_a, K_b)`, and restore the
+        states of the random number generators after it."""
+        if not self._journal:
+            return None
+        if self._journal[0]["k"] != (ka, kb):
+            self._logger.warning(f"The search departs from the checkpoint at {(ka, kb)}; stop replaying it.")
+            self._journal.clear()
+            return None
+        record = self._journal.popleft()
+        self._profile["replays"] += 1
+        self._rng.bit_generator.state = record["rng"]
+        np.random.set_state(record["np_random"])
+        random.setstate(record["random"])
+        return _unpack_result(record["result"])
+
+    def set_result_cache(self, cache_dir, max_bytes=None, seed=None):
+        """Look up the results of the engine in a persistent cache in ``cache_dir`` (see
+        :class:`biSBM.bookkeeping.ResultCache`), before computing them, and save them there.
+
+        A result is keyed by the content of the network, the class and the parameters of the engine (but not the paths
+        to its files), whether the bipartite prior is used, :math:`(K_a, K_b)`, the partition that the engine starts
+        from, if any, and ``seed``. Hence, the cache can be shared by the runs on the same network with different
+        parameters of the heuristic (e.g., :math:`i_0`), which visit many of the same points.
+
+        Parameters
+        ----------
+        cache_dir : ``str``
+
+        max_bytes : ``int`` (optional, default: ``None``)
+            Maximal size of the cache; the least recently used results are removed first. If ``None``, there is no
+            limit.
+
+        seed : ``int`` (optional, default: ``None``)
+            The results of different seeds are cached separately. If ``None``, the seed of this instance; the cached
+            results are then identical to the ones that would be computed.
+
+        """
+        self._result_cache = ResultCache(cache_dir, max_bytes=max_bytes)
+        self._result_cache_seed = seed
+
+    def _get_cached_result(self, ka, kb, run, init_k=None):
+        if self._result_cache is None:
+            return None
+        result = self._result_cache.get(self._get_result_key(ka, kb, run, init_k))
+        if result is None:
+            return None
+        self._logger.info(f"Found the result at {(ka, kb)} in the cache.")
+        self._profile["result_cache_hits"] += 1
+        return _unpack_result(result)
+
+    def _cache_result(self, ka, kb, run, result, init_k=None):
+        if self._result_cache is not None:
+            self._result_cache.put(self._get_result_key(ka, kb, run, init_k), _pack_result(result))
+        return result
+
+    def _get_result_key(self, ka, kb, run, init_k=None):
+        """Return the key of the result at :math:`(K_a, K_b)`, where the engine starts from the partition at point
+        ``init_k`` (or from scratch, if it is ``None``)."""
+        engine = self.engine_.__self__
+        # the `f_*` attributes are paths, which differ between machines but do not change the results
+        params = {k: v.item() if isinstance(v, np.generic) else v for k, v in vars(engine).items()
+                  if k not in _EXECUTION_ATTRS and not k.startswith("f_")}
+        params = {k: v for k, v in params.items() if isinstance(v, (bool, int, float, str, type(None)))}
+        k = None if ka is None else (int(ka), int(kb))
+        init_mb = None
+        if init_k is not None:
+            mb = np.ascontiguousarray(self.bookkeeping_mb["mcmc"][init_k], dtype=np.int64)
+            init_mb = hashlib.sha256(mb.tobytes()).hexdigest()
+        return {
+            "graph": self._get_graph_hash(), "engine": type(engine).__name__, "params": params,
+            "bipartite_prior": bool(self.bipartite_prior_), "k": k, "init_mb": init_mb,
+            "seed": [self._seed if self._result_cache_seed is None else self._result_cache_seed, run]
+        }
+
+    def _spawn_seeds(self, ka, kb):
+        """Return the index of this evaluation at :math:`(K_a, K_b)` (``(None, None)`` for the natural merge), and the
+        seeds of its engine calls."""
+        k = (0, 0) if ka is None else (int(ka), int(kb))
+        run = self._n_runs.get(k, 0)
+        self._n_runs[k] = run + 1
+        if not self._engine_takes_seed:
+            return run, [None] * self.max_n_sweeps_
+        return run, [np.random.SeedSequence(self._seed, spawn_key=k + (run, i)) for i in range(self.max_n_sweeps_)]
+
+    def _get_graph_hash(self):
+        if self._graph_hash is None:
+            h = hashlib.sha256("{} {} ".format(self.bm_state["n_a"], self.bm_state["n_b"]).encode())
+            for i in range(0, len(self.edgelist), 2 ** 20):
+                h.update(np.ascontiguousarray(self.edgelist[i: i + 2 ** 20], dtype=np.int64).tobytes())
+            self._graph_hash = h.hexdigest()
+        return self._graph_hash
+
+    def _get_search_params(self):
+        return {
+            "n_a": self.bm_state["n_a"], "n_b": self.bm_state["n_b"], "e": self.bm_state["e"],
+            "ka": self.bm_state["ka"], "kb": self.bm_state["kb"], "i_0": self.i_0,
+            "adaptive_ratio": self.adaptive_ratio, "k_th_nb_to_search": self._k_th_nb_to_search, "nm": self._nm,
+            "c": self._c, "exhaustive_merge_max_k": self._exhaustive_merge_max_k,
+            "batch_nb_search": self._batch_nb_search, "bipartite_prior": self.bipartite_prior_,
+            "virgin_run": self._virgin_run, "algm_args": dict(self._summary["algm_args"]), "seed": self._seed
+        }
+
+    def _set_search_params(self, params):
+        self.bm_state["ka"], self.bm_state["kb"], self.i_0 = params["ka"], params["kb"], params["i_0"]
+        self.adaptive_ratio = params["adaptive_ratio"]
+        self._k_th_nb_to_search = params["k_th_nb_to_search"]
+        self._nm = params["nm"]
+        self._c = params["c"]
+        self._exhaustive_merge_max_k = params["exhaustive_merge_max_k"]
+        self._batch_nb_search = params["batch_nb_search"]
+        self.bipartite_prior_ = params["bipartite_prior"]
+        self._virgin_run = params["virgin_run"]
+        self._summary["algm_args"] = dict(params["algm_args"])
+        self._seed = params["seed"]
+        self._rng = np.random.default_rng(self._seed)
+
+    def _get_protected_points(self):
+        points = [(self.bm_state["ka"], self.bm_state["kb"]),
+                  (self._summary["algm_args"]["init_ka"], self._summary["algm_args"]["init_kb"])]
+        if len(self.bookkeeping_dl) > 0:
+            points += [self.summary(mode="simple")[:2]]
+        return points
+
     def get_f_edgelist_name(self):
         return self._f_edgelist_name
 
+    def _get_engine_edgelist(self):
+        """Return what the engine reads the network from; i.e., the edgelist array or the temporary file name."""
+        if self.is_in_memory_:
+            return self.edgelist
+        return self._f_edgelist_name
+
+    def _get_shared_edgelist(self):
+        """Return what the engine reads the network from, in a form that is cheap to hand to the loky workers."""
+        if not self.is_in_memory_:
+            return self._f_edgelist_name
+        if self._shared_edgelist is None:
+            self._shared_edgelist = SharedArray(self._get_shared_path("edgelist.npy"), self.edgelist.astype(np.int_))
+            self._profile["tempfile_bytes"] += os.path.getsize(self._shared_edgelist.path)
+        return self._shared_edgelist
+
+    def _get_shared_mb(self, k):
+        """Return the partition at point ``k`` as a :class:`biSBM.utils.SharedArray`, or ``None`` if ``k`` is
+        ``None``."""
+        if k is None:
+            return None
+        if self._shared_mb.get(k) is None:
+            self._shared_mb[k] = SharedArray(self._get_shared_path("mb-{}-{}.npy".format(*k)),
+                                             np.asarray(self.bookkeeping_mb["mcmc"][k], dtype=np.int_))
+            self._profile["tempfile_bytes"] += os.path.getsize(self._shared_mb[k].path)
+        return self._shared_mb[k]
+
+    def _get_shared_path(self, name):
+        if self._shared_dir is None:
+            self._shared_dir = tempfile.mkdtemp(dir=self.tempdir)
+        return os.path.join(self._shared_dir, name)
+
     def get__q_cache(self):
         return self.__q_cache
 
@@ -628,7 +1174,7 @@ class OptimalKs(object):
         finally:
             for edge in self.edgelist:
                 content = str(edge[0]) + "\t" + str(edge[1]) + "\n"
-                self.f_edgelist.write(content.encode())
+                self._profile["tempfile_bytes"] += self.f_edgelist.write(content.encode())
             self.f_edgelist.flush()
             f_edgelist_name = self.f_edgelist.name
         if self.is_par_:
@@ -638,5 +1184,50 @@ class OptimalKs(object):
     def __del__(self):
         if self.__del__no_call:
             return
-        if self.is_par_:
+        if self.is_par_ and self._f_edgelist_name is not None:
             os.remove(self._f_edgelist_name)
+        if self._shared_dir is not None:
+            shutil.rmtree(self._shared_dir, ignore_errors=True)
+
+
+# engine attributes that do not change the results
+_EXECUTION_ATTRS = {"PARALLELIZATION", "NUM_CORES", "KL_PARALLELIZATION", "IN_MEMORY", "kl_verbose"}
+
+
+def _new_profile():
+    return {
+        "time": {"engine": 0., "dl": 0., "merge": 0., "neighbor_check": 0.},
+        "engine_calls": 0, "dl_evals": 0, "merges": 0, "neighbor_checks": 0, "cache_hits": 0,
+        "result_cache_hits": 0, "replays": 0, "tempfile_bytes": 0
+    }
+
+
+def _pack_result(result):
+    """Pack the :math:`e_{rs}` matrix and the partition of the output of :func:`OptimalKs.compute_dl` (or
+    :func:`OptimalKs.natural_merge`) with :func:`biSBM.bookkeeping.pack_array`."""
+    return (result[0], pack_array(result[1])[0], pack_array(result[2])[0]) + tuple(result[3:])
+
+
+def _unpack_result(result):
+    return (result[0], unpack_array(result[1]), unpack_array(result[2])) + tuple(result[3:])
+
+
+class _BudgetExhausted(Exception):
+    """Raised when the budget of :func:`OptimalKs.minimize_bisbm_dl` is used up."""
+    pass
+
+
+def _run_engine(engine, edgelist, na, nb, ka, kb, mb, seed, method=None):
+    """Run the engine once; the shared arrays (if any) are memory-mapped here."""
+    if isinstance(edgelist, SharedArray):
+        edgelist = np.asarray(edgelist)
+    if isinstance(mb, SharedArray):
+        mb = np.asarray(mb)
+    kwargs = dict() if seed is None else {"seed": seed}
+    if method is not None:
+        kwargs["method"] = method
+    return engine(edgelist, na, nb, ka, kb, mb=mb, **kwargs)
+
+
+def _run_sweeps(engine, edgelist, na, nb, ka, kb, mb, seeds):
+    return [_run_engine(engine, edgelist, na, nb, ka, kb, mb, seed) for seed in seeds]
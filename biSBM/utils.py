@@ -1,19 +1,32 @@
 """ Utilities for network data manipulation and entropy computation. """
-import heapq
+import random
+from collections import Counter
+from math import lgamma
 from .int_part import *
 from numba import njit
-from scipy.sparse import lil_matrix, coo_matrix
+from scipy.sparse import coo_matrix
 from scipy.special import comb
 from itertools import product, combinations
 from loky import get_reusable_executor
+from concurrent.futures import ThreadPoolExecutor
 
 
 def db_factorial_ln(val):
-    m = int(val)
-    if m & 0x1 == 1:  # m is odd
-        return gammaln(m + 1) - gammaln((m - 1) / 2 + 1) - ((m - 1) / 2) * np.log(2)
-    else:
-        return gammaln(m / 2 + 1) + (m / 2) * np.log(2)
+    m = np.asarray(val).astype(np.int_)
+    odd = m & 0x1 == 1
+    ent = np.where(odd,
+                   gammaln(m + 1) - gammaln((m - 1) / 2 + 1) - ((m - 1) / 2) * np.log(2),
+                   gammaln(m / 2 + 1) + (m / 2) * np.log(2))
+    return ent[()]
+
+
+@njit(cache=True)
+def _sum_in_order(x):
+    """Plain left-to-right sum, so that the vectorized entropies add up exactly as the element-wise loops did."""
+    s = 0.
+    for x_ in x:
+        s += x_
+    return s
 
 
 # #################
@@ -115,16 +128,13 @@ def adjacency_entropy(edgelist, mb, exact=True, multigraph=True):
         The description length (or entropy) in nat of the fitting.
     """
     ent = 0.
-    e_rs = np.zeros((max(mb) + 1, max(mb) + 1), dtype=np.int_)
-    m_ij = lil_matrix((len(mb), len(mb)), dtype=np.int_)
+    edgelist = np.asarray(edgelist, dtype=np.int_)
+    mb = np.asarray(mb, dtype=np.int_)
+    sources, targets = edgelist[:, 0], edgelist[:, 1]
+    k = int(np.max(mb)) + 1
+    b_s, b_t = mb[sources], mb[targets]
+    e_rs = np.bincount(np.concatenate((b_s * k + b_t, b_t * k + b_s)), minlength=k * k).reshape(k, k)
 
-    for i in edgelist:
-        # Please do check the index convention of the edgelist
-        source_group = int(mb[int(i[0])])
-        target_group = int(mb[int(i[1])])
-        e_rs[source_group][target_group] += 1
-        e_rs[target_group][source_group] += 1
-        m_ij[int(i[0]), int(i[1])] += 1  # we only update the upper triangular part of the adj-matrix
     italic_i = 0.
     e_r = np.sum(e_rs, axis=1, dtype=np.int_)
     sum_m_ii = 0.
@@ -134,38 +144,27 @@ def adjacency_entropy(edgelist, mb, exact=True, multigraph=True):
     sum_e_r = 0.
     if exact:
         if multigraph:
-            ind_i, ind_j = m_ij.nonzero()
-            for ind in zip(ind_i, ind_j):
-                val = m_ij[ind[0], ind[1]]
-                if val > 1:
-                    if ind[0] == ind[1]:
-                        sum_m_ii += db_factorial_ln(val)
-                    else:
-                        sum_m_ij += gammaln(val + 1)
-        for _e_r in e_r:
-            sum_e_r += gammaln(_e_r + 1)
-
-    for ind, e_val in enumerate(np.nditer(e_rs)):
-        ind_i = int(np.floor(ind / (e_rs.shape[0])))
-        ind_j = ind % (e_rs.shape[0])
-        if exact:
-            if ind_j > ind_i:
-                sum_e_rs += gammaln(e_val + 1)
-            elif ind_j == ind_i:
-                sum_e_rr += db_factorial_ln(e_val)
-        else:
-            if e_val != 0.0:
-                italic_i += e_val * np.log(
-                    e_val / e_r[ind_i] / e_r[ind_j]
-                )
+            # multiplicities of the (ordered) node pairs, i.e., the upper triangular part of the adj-matrix
+            n = len(mb)
+            ij, m_ij = np.unique(sources * n + targets, return_counts=True)
+            is_multi = m_ij > 1
+            is_loop = ij // n == ij % n
+            sum_m_ii = _sum_in_order(db_factorial_ln(m_ij[is_multi & is_loop]))
+            sum_m_ij = _sum_in_order(gammaln(m_ij[is_multi & ~is_loop] + 1))
+        sum_e_r = _sum_in_order(gammaln(e_r + 1))
+        sum_e_rs = _sum_in_order(gammaln(e_rs[np.triu_indices(k, 1)] + 1))
+        sum_e_rr = _sum_in_order(db_factorial_ln(np.diagonal(e_rs)))
+    else:
+        ind_i, ind_j = np.nonzero(e_rs)
+        e_val = e_rs[ind_i, ind_j]
+        italic_i = _sum_in_order(e_val * np.log(e_val / e_r[ind_i] / e_r[ind_j]))
 
     ent += -italic_i / 2
     n_k = assemble_n_k_from_edgelist(edgelist, mb)
 
-    ent_deg = 0
-    for deg, k in enumerate(n_k):
-        if deg != 0 and k != 0:
-            ent_deg -= k * gammaln(deg + 1)
+    deg = np.nonzero(n_k)[0]
+    deg = deg[deg != 0]
+    ent_deg = -_sum_in_order(n_k[deg] * gammaln(deg + 1))
 
     ent += ent_deg
     if exact:
@@ -245,7 +244,7 @@ def model_entropy(e, ka=None, kb=None, na=None, nb=None, nr=None, allow_empty=Fa
     return dl
 
 
-def degree_entropy(edgelist, mb, __q_cache=np.array([], ndmin=2), degree_dl_kind="distributed",
+def degree_entropy(edgelist, mb, __q_cache=None, degree_dl_kind="distributed",
                    q_cache_max_e_r=int(1e4)):
     """degree_entropy
 
@@ -258,7 +257,8 @@ def degree_entropy(edgelist, mb, __q_cache=np.array([], ndmin=2), degree_dl_kind
     mb : ``iterable`` or :class:`numpy.ndarray`
         Partition :math:`b` of nodes into blocks.
 
-    __q_cache : :class:`numpy.ndarray` (required, default: ``np.array([], ndmin=2)``)
+    __q_cache : :class:`QCache` (optional, default: ``None``)
+        Look-up table for :math:`\\log q(n, k)`. If ``None``, a table of size ``q_cache_max_e_r`` is created.
 
     degree_dl_kind: ``str``
 
@@ -278,29 +278,24 @@ def degree_entropy(edgelist, mb, __q_cache=np.array([], ndmin=2), degree_dl_kind
 
     """
     ent = 0
+    edgelist = np.asarray(edgelist, dtype=np.int_)
+    mb = np.asarray(mb, dtype=np.int_)
     n_r = assemble_n_r_from_mb(mb)
-
-    e_r = np.zeros(max(mb) + 1)
-    for i in edgelist:
-        # Please do check the index convention of the edgelist
-        source_group = int(mb[int(i[0])])
-        target_group = int(mb[int(i[1])])
-        e_r[source_group] += 1
-        e_r[target_group] += 1
+    e_r = np.bincount(mb[edgelist.ravel()], minlength=len(n_r))
 
     if degree_dl_kind == "uniform":
         ent += np.sum(lbinom(n_r + e_r - 1, e_r))
     elif degree_dl_kind == "distributed":
-        if len(__q_cache) == 1:
-            __q_cache = init_q_cache(q_cache_max_e_r, __q_cache)  # the pre-computed lookup table affects precision!
-        for ind, n_r_ in enumerate(n_r):
-            ent += log_q(e_r[ind], n_r_, __q_cache)
-        eta_rk = assemble_eta_rk_from_edgelist_and_mb(edgelist, mb)
-
-        for mb_, eta_rk_ in enumerate(eta_rk):
-            for eta in eta_rk_:
-                ent -= +gammaln(eta + 1)
-            ent -= -gammaln(n_r[mb_] + 1)
+        if __q_cache is None:
+            __q_cache = init_q_cache(q_cache_max_e_r)  # the pre-computed lookup table affects precision!
+        ent = [log_q(e_r[ind], n_r_, __q_cache) for ind, n_r_ in enumerate(n_r)]
+        eta_rk = assemble_eta_rk_from_edgelist_and_mb(edgelist, mb, sparse=True)
+
+        # -log(eta_rk!) for each (r, k) that occurs, then +log(n_r!) at the end of row r
+        width = eta_rk.shape[1] + 1
+        order = np.argsort(np.concatenate((eta_rk.row * width + eta_rk.col, np.arange(len(n_r)) * width + width - 1)))
+        ent_eta = np.concatenate((-gammaln(eta_rk.data + 1), gammaln(n_r + 1)))[order]
+        ent = _sum_in_order(np.concatenate((np.array(ent, dtype=np.float64), ent_eta)))
     elif degree_dl_kind == "entropy":
         raise NotImplementedError
     return ent
@@ -309,13 +304,15 @@ def degree_entropy(edgelist, mb, __q_cache=np.array([], ndmin=2), degree_dl_kind
 def virtual_moves_ds(ori_e_rs, mlists, ka):
     """virtual_moves_ds
 
-    virtual_moves_ds
+    Compute the change of the adjacency entropy for each candidate merge, and return the one that least alters it.
 
     Parameters
     ----------
     ori_e_rs : :class:`numpy.ndarray`
 
-    mlists : ``set``
+    mlists : :class:`numpy.ndarray`
+        Array of shape ``(M, 2)``, where each row holds the two block labels (of the same type) of a candidate merge.
+        See :func:`assemble_merge_candidates`.
 
     ka : ``int``
         Number of communities in type-*a*.
@@ -327,36 +324,81 @@ def virtual_moves_ds(ori_e_rs, mlists, ka):
     _mlist : :class:`numpy.ndarray`
 
     """
+    mlists = np.sort(np.asarray(mlists, dtype=np.int_).reshape(-1, 2), axis=1)
+    ori_e_rs = np.asarray(ori_e_rs, dtype=np.int_)
     ori_e_r = np.sum(ori_e_rs, axis=1)
-    size = ori_e_rs.shape[0] - 1
-    t = np.inf
-    dS = 0.
-    _mlist = np.zeros(2, dtype=np.int_)
-
-    for _ in mlists:
-        mlist = np.int_([_.split("+")[0], _.split("+")[1]])
-        if (np.max(mlist) >= ka > np.max(mlist)) or (np.max(mlist) == 0 and ka == 1) or (
-                np.max(mlist) == ka and ori_e_rs.shape[0] == 1 + ka):
-            continue
+    k = ori_e_rs.shape[0]
+    cond = (mlists[:, 0] != mlists[:, 1]) & ((mlists[:, 1] < ka) | (mlists[:, 0] >= ka)) & ~(
+            (mlists[:, 1] == 0) & (ka == 1)) & ~((mlists[:, 1] == ka) & (k == 1 + ka))
+    mlists = mlists[cond]
+
+    ds = _virtual_merges_ds(ori_e_rs, ori_e_r, gammaln(ori_e_rs + 1), gammaln(ori_e_r + 1), mlists, ka)
+    ds[ds < 0] = np.inf
+    if len(ds) == 0 or np.isinf(np.min(ds)):
+        return 0., np.zeros(2, dtype=np.int_)
+    idx = np.argmin(ds)
+    return ds[idx], mlists[idx]
+
+
+@njit(cache=True)
+def _virtual_merges_ds(e_rs, e_r, ln_e_rs, ln_e_r, mlists, ka):
+    k = e_rs.shape[0]
+    ds = np.empty(len(mlists))
+    for i in range(len(mlists)):
+        r, s = mlists[i]
+        if s < ka:  # we are merging groups of type-a
+            lo, hi = ka, k
         else:
-            if np.max(mlist) < ka:  # we are merging groups of type-a
-                _1, _2 = ori_e_rs[[mlist[0], mlist[1]], ka + 1: size + 1]
-            else:
-                _1, _2 = ori_e_rs[[mlist[0], mlist[1]], 0: ka]
-            _ds = 0
-            _ds -= np.sum(gammaln(_1 + _2 + 1))
-            _ds += np.sum(gammaln(_1 + 1))
-            _ds += np.sum(gammaln(_2 + 1))
+            lo, hi = 0, ka
+        _ds = 0.
+        for t in range(lo, hi):
+            _ds -= lgamma(e_rs[r, t] + e_rs[s, t] + 1) - ln_e_rs[r, t] - ln_e_rs[s, t]
+        _ds += lgamma(e_r[r] + e_r[s] + 1) - ln_e_r[r] - ln_e_r[s]
+        ds[i] = _ds
+    return ds
 
-            _3, _4 = ori_e_r[[mlist[0], mlist[1]]]
-            _ds += gammaln(_3 + _4 + 1)
-            _ds -= gammaln(_3 + 1) + gammaln(_4 + 1)
 
-            if 0 <= _ds < t:
-                t = _ds
-                dS, _mlist = _ds, mlist
+def assemble_merge_candidates(ka, kb, nm=None, rng=None):
+    """Assemble the candidate pairs of blocks to merge.
 
-    return dS, _mlist
+    Parameters
+    ----------
+    ka : ``int``
+        Number of communities in type-*a*.
+
+    kb : ``int``
+        Number of communities in type-*b*.
+
+    nm : ``int`` (optional, default: ``None``)
+        For each block, the number of blocks drawn at random (with replacement) as merge partners, as in the
+        agglomerative heuristic. If ``None``, all the :math:`O(K^2)` pairs of blocks of the same type are returned.
+
+    rng : :class:`numpy.random.Generator` (optional, default: ``None``)
+        The generator to draw the partners from. If ``None``, the global :mod:`random` module is used.
+
+    Returns
+    -------
+    mlists : :class:`numpy.ndarray`
+        Array of shape ``(M, 2)`` of unique pairs ``(r, s)`` with ``r < s``, both of the same type.
+
+    """
+    if nm is None:
+        a = np.array(np.triu_indices(ka, 1)).T
+        b = np.array(np.triu_indices(kb, 1)).T + ka
+        return np.concatenate((a, b)).astype(np.int_)
+    m = np.arange(ka + kb)
+    mlists = np.empty((0, 2), dtype=np.int_)
+    while len(mlists) == 0:
+        if rng is None:
+            pool = np.array(random.choices(m, k=nm * len(m))).reshape(len(m), nm)
+        else:
+            pool = rng.choice(m, size=(len(m), nm))
+        _m = np.broadcast_to(m[:, np.newaxis], pool.shape)
+        mlists = np.stack((np.minimum(pool, _m).ravel(), np.maximum(pool, _m).ravel()), axis=1)
+        cond = (mlists[:, 0] != mlists[:, 1]) & ~((mlists[:, 1] >= ka) & (ka > mlists[:, 0])) & ~(
+                (mlists[:, 0] == 0) & (ka == 1)) & ~((mlists[:, 0] == ka) & (kb == 1))
+        mlists = np.unique(mlists[cond], axis=0)
+    return mlists
 
 
 # ####################
@@ -466,7 +508,7 @@ def gen_e_rs(b, n_edges, p=0):
     return e_rs
 
 
-def gen_e_rs_harder(ka, kb, n_edges, samples=1, top_k=1):
+def gen_e_rs_harder(ka, kb, n_edges, samples=1, top_k=1, batch_size=2 ** 14):
     """gen_e_rs_harder
 
     Parameters
@@ -486,36 +528,56 @@ def gen_e_rs_harder(ka, kb, n_edges, samples=1, top_k=1):
     top_k : ``int``
         Number of samples selected. These are `top-k` samples with higher profile likelihood.
 
+    batch_size : ``int`` (optional, default: ``2 ** 14``)
+        Number of draws that are made and scored at once; it bounds the memory to ``batch_size * ka * kb`` entries.
+
     Returns
     -------
     e_rs : :class:`numpy.ndarray` or ``list[numpy.ndarray]`` (when ``top_k > 1``)
-        Edge counts matrix.
+        Edge counts matrix. The list is sorted by decreasing profile likelihood.
 
     """
     if top_k <= 0:
         raise ValueError("Argument `top_k` needs to be a positive integer.")
-    e_rs_inst = []
-    for _ in range(int(samples)):
-        c = np.int_(np.random.dirichlet([1] * ka * kb, 1)[0] * n_edges)
-        e_rs = np.zeros((ka + kb, ka + kb), dtype=np.int_)
-        remain_c = n_edges - np.sum(c, dtype=np.int_)
-        for idx, _ in enumerate(range(remain_c)):
-            c[idx] += 1
-        perm = product(range(0, ka), range(ka, ka + kb))
-        for idx, p in enumerate(perm):
-            i = p[0]
-            j = p[1]
-            e_rs[i][j] = c[idx]
-            e_rs[j][i] = e_rs[i][j]
-        heapq.heappush(e_rs_inst, (- compute_profile_likelihood_from_e_rs(e_rs), e_rs))
-    e_rs = heapq.heappop(e_rs_inst)[1]
+    samples = int(samples)
+    top_k = min(int(top_k), samples)
+    top_c = np.empty((0, ka, kb), dtype=np.int_)
+    top_l = np.empty(0)
+    for i in range(0, samples, int(batch_size)):
+        size = min(int(batch_size), samples - i)
+        c = np.int_(np.random.dirichlet([1] * ka * kb, size) * n_edges)
+        # the edges left by the rounding go to the first entries, one each
+        remain_c = n_edges - np.sum(c, axis=1, dtype=np.int_)
+        c += np.arange(ka * kb) < remain_c[:, np.newaxis]
+        c = np.concatenate((top_c, c.reshape(size, ka, kb)))
+        likelihood = np.concatenate((top_l, _compute_profile_likelihoods_from_c(c[len(top_c):])))
+        if len(likelihood) > top_k:
+            idx = np.argpartition(-likelihood, top_k - 1)[:top_k]
+        else:
+            idx = np.arange(len(likelihood))
+        top_c, top_l = c[idx], likelihood[idx]
+    order = np.argsort(-top_l, kind="stable")
+    e_rs = np.zeros((top_k, ka + kb, ka + kb), dtype=np.int_)
+    e_rs[:, :ka, ka:] = top_c[order]
+    e_rs[:, ka:, :ka] = top_c[order].transpose(0, 2, 1)
     if samples == 1 or top_k == 1:
-        return e_rs
+        return e_rs[0]
     else:
-        e_rs = []
-        for _ in range(top_k):
-            e_rs += [heapq.heappop(e_rs_inst)[1]]
-        return e_rs
+        return list(e_rs)
+
+
+def _compute_profile_likelihoods_from_c(c):
+    """Profile likelihoods (see :func:`compute_profile_likelihood_from_e_rs`) of a batch of bipartite :math:`e_{rs}`,
+    given by their type-*a* by type-*b* blocks ``c``, of shape ``(samples, ka, kb)``."""
+    c = c.astype(np.float64)
+    num_edges = c.sum(axis=(1, 2))
+    e_r = c.sum(axis=2)
+    e_s = c.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = c * np.log(c * 2 * num_edges[:, np.newaxis, np.newaxis] / e_r[:, :, np.newaxis] /
+                           e_s[:, np.newaxis, :])
+    # each entry appears twice in the symmetric e_rs
+    return np.where(c > 0, terms, 0.).sum(axis=(1, 2)) / num_edges
 
 
 def gen_e_rs_hard(ka, kb, n_edges, p=0):
@@ -645,6 +707,104 @@ def gen_bicliques_edgelist(b, num_nodes):
     return el, types
 
 
+def gen_bisbm_edgelist(e_rs, n_r, ka, degrees=None, seed=None, f_edgelist=None, chunk_size=2 ** 24):
+    """Sample a bipartite (multi)graph from the microcanonical degree-corrected stochastic block model.
+
+    The nodes are labelled block by block, so that node ``i`` is in block ``np.repeat(np.arange(ka + kb), n_r)[i]``
+    and the type-*a* nodes come first. Each node gets as many half-edges as its degree; the half-edges of each block
+    are shuffled, and dealt to the blocks of the other type in the amounts of :math:`e_{rs}`. Hence, the graph has
+    exactly the given :math:`e_{rs}` and degrees, and its sampling takes :math:`O(E)` time.
+
+    Parameters
+    ----------
+    e_rs : :class:`numpy.ndarray`
+        Edge counts matrix, either of shape ``(ka + kb, ka + kb)`` (e.g., from :func:`gen_e_rs`) or ``(ka, kb)``.
+
+    n_r : ``iterable``
+        Number of nodes in each block; the first ``ka`` blocks are of type-*a*.
+
+    ka : ``int``
+        Number of type-*a* blocks.
+
+    degrees : ``iterable`` (optional, default: ``None``)
+        Degree of each node. The degrees of the nodes of block :math:`r` have to sum to :math:`e_r`. If ``None``, the
+        half-edges of each block are spread uniformly at random among its nodes (i.e., no degree correction).
+
+    seed : ``int`` or :class:`numpy.random.Generator` (optional, default: ``None``)
+        See :func:`get_rng`.
+
+    f_edgelist : ``str`` (optional, default: ``None``)
+        If given, the edges are written to this file (tab-separated, one edge per line), ``chunk_size`` at a time,
+        instead of being returned. Only the half-edges are held in memory, which takes 4 bytes per half-edge if there
+        are less than :math:`2^{31}` nodes.
+
+    chunk_size : ``int`` (optional, default: ``2 ** 24``)
+        Number of edges written at a time.
+
+    Returns
+    -------
+    el : :class:`numpy.ndarray` or ``None``
+        The edgelist, sorted by the pair of blocks of its endpoints; ``None`` if it is written to ``f_edgelist``.
+
+    """
+    rng = get_rng(seed)
+    n_r = np.asarray(n_r, dtype=np.int64)
+    kb = len(n_r) - ka
+    e_rs = np.asarray(e_rs, dtype=np.int64)
+    if e_rs.shape == (ka + kb, ka + kb):
+        e_rs = e_rs[:ka, ka:]
+    assert e_rs.shape == (ka, kb), "[ERROR] e_rs should be of shape ({0}, {0}) or ({1}, {2}); here it is {3}".format(
+        ka + kb, ka, kb, e_rs.shape)
+    assert np.all(e_rs >= 0), "[ERROR] e_rs should be non-negative."
+    e_r = np.concatenate((e_rs.sum(axis=1), e_rs.sum(axis=0)))
+    n = int(n_r.sum())
+    mb = np.repeat(np.arange(ka + kb), n_r)
+    if degrees is None:
+        assert np.all((n_r > 0) | (e_r == 0)), "[ERROR] A block with edges has no nodes."
+        degrees = np.zeros(n, dtype=np.int64)
+        offset = np.concatenate(([0], np.cumsum(n_r)))
+        for r in np.flatnonzero(n_r):
+            degrees[offset[r]: offset[r + 1]] = rng.multinomial(e_r[r], np.full(n_r[r], 1. / n_r[r]))
+    else:
+        degrees = np.asarray(degrees, dtype=np.int64)
+        assert len(degrees) == n, "[ERROR] There should be one degree per node, i.e., {}; here there are {}".format(
+            n, len(degrees))
+        assert np.array_equal(np.bincount(mb, weights=degrees, minlength=ka + kb), e_r), \
+            "[ERROR] The degrees of the nodes of each block should sum to e_r."
+
+    # the half-edges of each type, block by block, and shuffled within each block
+    dtype = np.int32 if n < 2 ** 31 else np.int64
+    stubs = np.repeat(np.arange(n, dtype=dtype), degrees)
+    e_a = int(e_r[:ka].sum())
+    offset = np.concatenate(([0], np.cumsum(e_r)))
+    for r in range(ka + kb):
+        rng.shuffle(stubs[offset[r]: offset[r + 1]])
+    stubs_a, stubs_b = stubs[:e_a], stubs[e_a:]
+
+    # the edges are ordered by (r, s); those of (r, s) take the half-edges of block r after the ones dealt to the
+    # blocks before s, and the half-edges of block s after the ones dealt to the blocks before r
+    counts = e_rs.ravel()
+    start = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    start_b = (np.concatenate(([0], np.cumsum(e_rs.T.ravel())[:-1])).reshape(kb, ka).T.ravel())
+    nonempty = np.flatnonzero(counts)
+    start, start_b = start[nonempty], start_b[nonempty]
+
+    def edges(i, j):
+        idx = np.arange(i, j)
+        pair = np.searchsorted(start, idx, side="right") - 1
+        el = np.empty((j - i, 2), dtype=np.int_)
+        el[:, 0] = stubs_a[i: j]
+        el[:, 1] = stubs_b[start_b[pair] + idx - start[pair]]
+        return el
+
+    if f_edgelist is None:
+        return edges(0, e_a)
+    with open(f_edgelist, "wb") as f:
+        for i in range(0, e_a, int(chunk_size)):
+            np.savetxt(f, edges(i, min(i + int(chunk_size), e_a)), fmt="%d", delimiter="\t")
+    return None
+
+
 def assemble_old2new_mapping(types):
     """Create a mapping that map the old node-id's to new ones, such that the types-array is sorted orderly.
 
@@ -664,23 +824,13 @@ def assemble_old2new_mapping(types):
         The new types-array, which is sorted orderly and directly applicable to :class:`det_k_bisbm.OptimalKs`.
 
     """
-    old2new = dict()
+    types = np.asarray(types)
+    new2old = np.concatenate((np.flatnonzero(types == 1), np.flatnonzero(types == 2)))
     new_types = np.zeros(len(types), dtype=np.int_)
+    new_types[:len(new2old)] = types[new2old]
 
-    new_id = 0
-    for _id, t in enumerate(types):
-        if t == 1:
-            old2new[_id] = new_id
-            new_types[new_id] = 1
-            new_id += 1
-
-    for _id, t in enumerate(types):
-        if t == 2:
-            old2new[_id] = new_id
-            new_types[new_id] = 2
-            new_id += 1
-
-    new2old = {value: key for key, value in old2new.items()}
+    new2old = dict(enumerate(new2old.tolist()))
+    old2new = {value: key for key, value in new2old.items()}
     return old2new, new2old, new_types
 
 
@@ -696,8 +846,8 @@ def assemble_edgelist_old2new(edgelist, old2new):
     ----------
     edgelist : :class:`numpy.ndarray`
 
-    old2new : ``dict``
-        Dictionary that maps the old node index to a new one.
+    old2new : ``dict`` or :class:`numpy.ndarray`
+        Dictionary (or array) that maps the old node index to a new one.
 
     Returns
     -------
@@ -705,14 +855,11 @@ def assemble_edgelist_old2new(edgelist, old2new):
       The new edgelist of a group of bi-cliques (directly pluggable to :class:`det_k_bisbm.OptimalKs`)
 
     """
-    el = np.zeros((len(edgelist), 2), dtype=np.int_)
-    for _id, _ in enumerate(edgelist):
-        el[_id][0] = old2new[_[0]]
-        el[_id][1] = old2new[_[1]]
+    el = _mapping_to_array(old2new)[np.asarray(edgelist, dtype=np.int_)]
+    assert np.all(el >= 0), "[ERROR] some nodes of the edgelist are missing in old2new"
     return el
 
 
-@njit(cache=True)
 def assemble_mb_new2old(mb, new2old):
     """Assemble the partition that corresponds to the old space of node indices.
 
@@ -721,8 +868,8 @@ def assemble_mb_new2old(mb, new2old):
     mb : :class:`numpy.ndarray`
         Partition :math:`b` of nodes into blocks.
 
-    new2old : ``dict``
-        Dictionary that maps the new node index to the old one; i.e., a reverse mapping of ``old2new``.
+    new2old : ``dict`` or :class:`numpy.ndarray`
+        Dictionary (or array) that maps the new node index to the old one; i.e., a reverse mapping of ``old2new``.
 
     Returns
     -------
@@ -731,11 +878,20 @@ def assemble_mb_new2old(mb, new2old):
 
     """
     old_mb = np.zeros(len(mb), dtype=np.int_)
-    for _id, _ in enumerate(mb):
-        old_mb[new2old[_id]] = _
+    old_mb[_mapping_to_array(new2old)[:len(mb)]] = mb
     return old_mb
 
 
+def _mapping_to_array(mapping):
+    """Turn a ``dict`` between (non-negative) node indices into a look-up array; arrays are returned as is."""
+    if not isinstance(mapping, dict):
+        return np.asarray(mapping, dtype=np.int_)
+    keys = np.fromiter(mapping.keys(), dtype=np.int_, count=len(mapping))
+    array = np.full(np.max(keys) + 1 if len(keys) > 0 else 0, -1, dtype=np.int_)
+    array[keys] = np.fromiter(mapping.values(), dtype=np.int_, count=len(mapping))
+    return array
+
+
 @njit(cache=True)
 def assemble_n_r_from_mb(mb):
     """Get :math:`n_r`, i.e., the number of nodes in each group, from the partition :math:`b`.
@@ -787,7 +943,7 @@ def assemble_n_k_from_edgelist(edgelist, mb):
     return n_k
 
 
-def assemble_e_rs_from_mb(edgelist, mb):
+def assemble_e_rs_from_mb(edgelist, mb, sparse=False):
     """Get :math:`e_{rs}`, i.e., the matrix of edge counts between blocks.
 
     Parameters
@@ -798,25 +954,32 @@ def assemble_e_rs_from_mb(edgelist, mb):
     mb : :class:`numpy.ndarray`
         Partition :math:`b` of nodes into blocks.
 
+    sparse : ``bool`` (optional, default: ``False``)
+        Whether to return a :class:`scipy.sparse.csr_matrix`, which only stores the nonzero entries; useful when the
+        number of blocks is large.
+
     Returns
     -------
-    e_rs : :class:`numpy.ndarray`
+    e_rs : :class:`numpy.ndarray` or :class:`scipy.sparse.csr_matrix`
         Edge count matrix :math:`e_{rs}`.
 
     """
-    sources, targets = zip(*edgelist)
-    sources = [mb[node] for node in sources]
-    targets = [mb[node] for node in targets]
-    data = np.ones(len(sources + targets), dtype=np.int_)
-    shape = int(np.max(mb) + 1)
-    e_rs = coo_matrix((data, (sources + targets, targets + sources)), shape=(shape, shape))
-
-    return e_rs.toarray()
+    edgelist = np.asarray(edgelist)
+    mb = np.asarray(mb, dtype=np.int_)
+    k = int(np.max(mb) + 1)
+    # block-pair keys, r * K + s
+    keys = mb[edgelist[:, 0]] * k + mb[edgelist[:, 1]]
+    if sparse:
+        keys, counts = np.unique(keys, return_counts=True)
+        e_rs = coo_matrix((counts, (keys // k, keys % k)), shape=(k, k)).tocsr()
+    else:
+        e_rs = np.bincount(keys, minlength=k * k).reshape(k, k)
+    return e_rs + e_rs.T
 
 
-@njit(cache=True)
-def assemble_eta_rk_from_edgelist_and_mb(edgelist, mb):
-    """Get :math:`\eta_{rk}`, or the number :math:`\eta_{rk}` of nodes of degree :math:`k` that belong to group :math:`r`.
+def assemble_eta_rk_from_edgelist_and_mb(edgelist, mb, sparse=False):
+    """Get :math:`\\eta_{rk}`, or the number :math:`\\eta_{rk}` of nodes of degree :math:`k` that belong to group
+    :math:`r`.
 
     Parameters
     ----------
@@ -825,31 +988,25 @@ def assemble_eta_rk_from_edgelist_and_mb(edgelist, mb):
     mb : :class:`numpy.ndarray`
         Partition :math:`b` of nodes into blocks.
 
+    sparse : ``bool`` (optional, default: ``False``)
+        Whether to return a :class:`scipy.sparse.coo_matrix`, which only stores the (block, degree) pairs that occur,
+        in row-major order; useful when the degrees are spread out.
+
     Returns
     -------
-    eta_rk : :class:`numpy.ndarray`
+    eta_rk : :class:`numpy.ndarray` or :class:`scipy.sparse.coo_matrix`
+        Histogram of shape ``(K, k_max + 1)``.
 
     """
-    mb_max_ = np.int_(np.max(mb))
-
-    k = np.zeros((mb_max_ + 1, len(mb)), dtype=np.int_)
-
-    for idx in range(len(edgelist)):
-        k[mb[edgelist[idx][0]]][edgelist[idx][0]] += 1
-        k[mb[edgelist[idx][1]]][edgelist[idx][1]] += 1
-
-    max_array = np.empty(k.shape[0], dtype=np.int_)
-    for _k_idx in range(len(k)):
-        max_array[_k_idx] = np.max(k[_k_idx])
-    max_ = np.max(max_array)
-
-    eta_rk = np.zeros((mb_max_ + 1, max_ + 1), dtype=np.int_)
-    for mb_ in range(mb_max_ + 1):
-        for node_idx, k_ in enumerate(k[mb_]):
-            if mb[node_idx] == mb_:
-                eta_rk[mb_][k_] += 1
-
-    return eta_rk
+    edgelist = np.asarray(edgelist, dtype=np.int_)
+    mb = np.asarray(mb, dtype=np.int_)
+    k = np.bincount(edgelist.ravel(), minlength=len(mb))
+    width = int(np.max(k)) + 1
+    rk, eta_rk = np.unique(mb * width + k, return_counts=True)
+    eta_rk = coo_matrix((eta_rk, (rk // width, rk % width)), shape=(int(np.max(mb)) + 1, width))
+    if sparse:
+        return eta_rk
+    return eta_rk.toarray()
 
 
 def compute_profile_likelihood(edgelist, mb, ka=None, kb=None, k=None):
@@ -937,7 +1094,7 @@ def compute_profile_likelihood_from_e_rs(e_rs):
 
 
 def get_desc_len_from_data(na, nb, n_edges, ka, kb, edgelist, mb, diff=False, nr=None, allow_empty=False,
-                           degree_dl_kind="distributed", q_cache=np.array([], ndmin=2), is_bipartite=True):
+                           degree_dl_kind="distributed", q_cache=None, is_bipartite=True):
     """Description length difference to a randomized instance
 
     Parameters
@@ -1068,11 +1225,344 @@ def accept_mb_merge(mb, mlist):
     return _mb
 
 
+def accept_e_rs_merge(e_rs, mlist):
+    """accept_e_rs_merge
+
+    Accept partition merge on the edge count matrix, without going through the edgelist. This is the counterpart of
+    :func:`accept_mb_merge`, i.e., ``accept_e_rs_merge(assemble_e_rs_from_mb(edgelist, mb), mlist)`` equals
+    ``assemble_e_rs_from_mb(edgelist, accept_mb_merge(mb, mlist))``.
+
+    Parameters
+    ----------
+    e_rs : :class:`numpy.ndarray`
+        The (symmetric) edge count matrix, of shape ``(K, K)``.
+
+    mlist : ``iterable`` or :class:`numpy.ndarray`
+        The two block labels to be merged.
+
+    Returns
+    -------
+    _e_rs : :class:`numpy.ndarray`
+        The merged edge count matrix, of shape ``(K - 1, K - 1)``.
+
+    """
+    r, s = sorted(mlist)
+    _e_rs = np.array(e_rs)
+    _e_rs[r] += _e_rs[s]
+    _e_rs[:, r] += _e_rs[:, s]
+    return np.delete(np.delete(_e_rs, s, axis=0), s, axis=1)
+
+
+class MergedPartition(object):
+    """Partition obtained by merging the blocks of a base partition, which is only materialized on demand.
+
+    A merge only updates the map from the base block labels to the merged ones, and the block sizes :math:`n_r`,
+    which costs :math:`O(K)`; the base partition is shared (not copied) by all the partitions merged from it. Use
+    :func:`numpy.asarray` to get the membership vector.
+
+    Parameters
+    ----------
+    mb : ``iterable`` or :class:`numpy.ndarray`
+        The base partition :math:`b` of nodes into blocks.
+
+    label : :class:`numpy.ndarray` (optional, default: ``None``)
+        Map from the blocks of ``mb`` to the merged blocks. If ``None``, the identity.
+
+    n_r : :class:`numpy.ndarray` (optional, default: ``None``)
+        Number of nodes in each merged block. If ``None``, it is computed from ``mb``.
+
+    """
+    def __init__(self, mb, label=None, n_r=None):
+        self.mb = np.asarray(mb, dtype=np.int_)
+        self.n_r = assemble_n_r_from_mb(self.mb) if n_r is None else n_r
+        self.label = np.arange(len(self.n_r)) if label is None else label
+
+    @classmethod
+    def from_mb(cls, mb):
+        """Wrap ``mb``, unless it is already a :class:`MergedPartition`."""
+        if isinstance(mb, cls):
+            return mb
+        return cls(mb)
+
+    def merge(self, mlist):
+        """Return the partition where the two blocks in ``mlist`` are merged (see :func:`accept_mb_merge`)."""
+        r, s = sorted(mlist)
+        label = self.label.copy()
+        label[label == s] = r
+        label[label > s] -= 1
+        n_r = self.n_r.copy()
+        n_r[r] += n_r[s]
+        return MergedPartition(self.mb, label, np.delete(n_r, s))
+
+    def __array__(self, dtype=None, copy=None):
+        return self.label[self.mb].astype(np.int_ if dtype is None else dtype, copy=False)
+
+    def __len__(self):
+        return len(self.mb)
+
+    def __getitem__(self, item):
+        return np.asarray(self)[item]
+
+    def __iter__(self):
+        return iter(np.asarray(self))
+
+
+# ###########
+# Block state
+# ###########
+
+
+class BlockState(object):
+    """Sufficient statistics of a bipartite partition, for incremental updates of the description length.
+
+    The state keeps :math:`e_{rs}`, :math:`e_r`, :math:`n_r` and :math:`\\eta_{rk}`, so that the change of the
+    description length (as computed by :func:`get_desc_len_from_data`) can be evaluated in :math:`O(k_v)` for moving a
+    node :math:`v` of degree :math:`k_v`, and in :math:`O(K)` for merging two blocks, instead of rebuilding everything
+    from the edgelist.
+
+    Parameters
+    ----------
+    edgelist : :class:`numpy.ndarray`
+        List of edge tuples.
+
+    mb : :class:`numpy.ndarray`
+        Partition :math:`b` of nodes into blocks. The first ``na`` nodes are of type-*a*, and they are assigned to the
+        first ``ka`` blocks.
+
+    na : ``int``
+        Number of nodes in type-*a*.
+
+    nb : ``int``
+        Number of nodes in type-*b*.
+
+    ka : ``int``
+        Number of communities in type-*a*.
+
+    kb : ``int``
+        Number of communities in type-*b*.
+
+    q_cache : :class:`biSBM.int_part.QCache` (optional, default: ``None``)
+
+    is_bipartite : ``bool`` (optional, default: ``True``)
+        Whether to use the bipartite prior for edge counts; see :func:`model_entropy`.
+
+    Notes
+    -----
+    Node moves keep the number of blocks fixed, even if a block becomes empty. Merges relabel the blocks as
+    :func:`accept_mb_merge` does.
+
+    """
+    def __init__(self, edgelist, mb, na, nb, ka, kb, q_cache=None, is_bipartite=True):
+        edgelist = np.asarray(edgelist, dtype=np.int_)
+        self.mb = np.array(mb, dtype=np.int_)
+        self.na, self.nb = int(na), int(nb)
+        self.ka, self.kb = int(ka), int(kb)
+        self.e = len(edgelist)
+        self.is_bipartite = is_bipartite
+        if q_cache is None:
+            q_cache = init_q_cache(min(self.e, int(1e4)))
+        self._q_cache = q_cache
+
+        # adjacency list in CSR form; each edge is listed at both of its end-points
+        n = len(self.mb)
+        sources = np.concatenate((edgelist[:, 0], edgelist[:, 1]))
+        targets = np.concatenate((edgelist[:, 1], edgelist[:, 0]))
+        self._adj = targets[np.argsort(sources, kind="stable")]
+        self._adj_ptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=n))))
+        self.k = np.diff(self._adj_ptr)
+
+        k = self.ka + self.kb
+        b_s, b_t = self.mb[edgelist[:, 0]], self.mb[edgelist[:, 1]]
+        self.e_rs = np.bincount(np.concatenate((b_s * k + b_t, b_t * k + b_s)), minlength=k * k).reshape(k, k)
+        self.e_r = np.sum(self.e_rs, axis=1)
+        self.n_r = np.bincount(self.mb, minlength=k)
+        self.eta_r = [Counter() for _ in range(k)]
+        width = int(np.max(self.k)) + 1
+        rk, eta_rk = np.unique(self.mb * width + self.k, return_counts=True)
+        for rk_, eta in zip(rk, eta_rk):
+            self.eta_r[rk_ // width][rk_ % width] = eta
+
+        # the terms of the adjacency entropy that do not depend on the partition
+        ij, m_ij = np.unique(edgelist[:, 0] * n + edgelist[:, 1], return_counts=True)
+        is_loop = ij // n == ij % n
+        n_k = np.bincount(self.k)
+        self._adj_const = np.sum(db_factorial_ln(m_ij[is_loop])) + np.sum(gammaln(m_ij[~is_loop] + 1)) - np.sum(
+            n_k * gammaln(np.arange(len(n_k)) + 1))
+
+    def entropy(self):
+        """Return the description length of the current partition (in nats)."""
+        k = self.ka + self.kb
+        ent = self._adj_const
+        ent -= np.sum(gammaln(self.e_rs[np.triu_indices(k, 1)] + 1))
+        ent -= np.sum(db_factorial_ln(np.diagonal(self.e_rs)))
+        ent += np.sum(gammaln(self.e_r + 1))
+        ent += model_entropy(self.e, ka=self.ka, kb=self.kb, na=self.na, nb=self.nb, nr=self.n_r,
+                             is_bipartite=self.is_bipartite)[0]
+        for r in range(k):
+            ent += log_q(self.e_r[r], self.n_r[r], self._q_cache)
+            ent -= np.sum(gammaln(np.fromiter(self.eta_r[r].values(), dtype=np.int_) + 1))
+            ent += gammaln(self.n_r[r] + 1)
+        return float(ent)
+
+    def virtual_move_ds(self, v, s):
+        """Return the change of the description length if node ``v`` were moved to block ``s``."""
+        r = self.mb[v]
+        if r == s:
+            return 0.
+        self._check_move(v, s)
+        k, d_e_rs = self._move_d_e_rs(v, s)
+        e_rs, e_r, n_r = self.e_rs, self.e_r, self.n_r
+        ds = 0.
+        for (x, y), d in d_e_rs.items():
+            if x != y:
+                ds -= gammaln(e_rs[x, y] + d + 1) - gammaln(e_rs[x, y] + 1)
+            else:
+                ds -= db_factorial_ln(e_rs[x, x] + d) - db_factorial_ln(e_rs[x, x])
+        ds += gammaln(e_r[r] - k + 1) - gammaln(e_r[r] + 1)
+        ds += gammaln(e_r[s] + k + 1) - gammaln(e_r[s] + 1)
+
+        ds += log_q(e_r[r] - k, n_r[r] - 1, self._q_cache) - log_q(e_r[r], n_r[r], self._q_cache)
+        ds += log_q(e_r[s] + k, n_r[s] + 1, self._q_cache) - log_q(e_r[s], n_r[s], self._q_cache)
+        ds += np.log(self.eta_r[r][k]) - np.log(self.eta_r[s][k] + 1)
+        # the log(n_r!) terms of the partition and the degree entropies cancel out
+        return float(ds)
+
+    def move(self, v, s):
+        """Move node ``v`` to block ``s``."""
+        r = self.mb[v]
+        if r == s:
+            return
+        self._check_move(v, s)
+        k, d_e_rs = self._move_d_e_rs(v, s)
+        for (x, y), d in d_e_rs.items():
+            self.e_rs[x, y] += d
+            if x != y:
+                self.e_rs[y, x] += d
+        self.e_r[r] -= k
+        self.e_r[s] += k
+        self.n_r[r] -= 1
+        self.n_r[s] += 1
+        self.eta_r[r][k] -= 1
+        if self.eta_r[r][k] == 0:
+            del self.eta_r[r][k]
+        self.eta_r[s][k] += 1
+        self.mb[v] = s
+
+    def virtual_merge_ds(self, r, s, relative=False):
+        """Return the change of the description length if blocks ``r`` and ``s`` (of the same type) were merged.
+
+        If ``relative``, leave out the terms that are the same for all the merges of that type (i.e., the priors of
+        the edge counts and of the partition), which is enough to rank them; the change then only depends on the two
+        blocks, and does not change when other blocks of the type are merged.
+        """
+        r, s = min(r, s), max(r, s)
+        self._check_merge(r, s)
+        e_rs, e_r, n_r = self.e_rs, self.e_r, self.n_r
+        others = np.ones(len(e_r), dtype=bool)
+        others[[r, s]] = False
+        ds = -np.sum(gammaln(e_rs[r, others] + e_rs[s, others] + 1) - gammaln(e_rs[r, others] + 1) -
+                     gammaln(e_rs[s, others] + 1))
+        ds -= db_factorial_ln(e_rs[r, r] + e_rs[s, s] + 2 * e_rs[r, s]) - db_factorial_ln(
+            e_rs[r, r]) - db_factorial_ln(e_rs[s, s])
+        ds += gammaln(e_rs[r, s] + 1)
+        ds += gammaln(e_r[r] + e_r[s] + 1) - gammaln(e_r[r] + 1) - gammaln(e_r[s] + 1)
+
+        ds += log_q(e_r[r] + e_r[s], n_r[r] + n_r[s], self._q_cache)
+        ds -= log_q(e_r[r], n_r[r], self._q_cache) + log_q(e_r[s], n_r[s], self._q_cache)
+        eta_r, eta_s = self.eta_r[r], self.eta_r[s]
+        for k in eta_s:
+            ds -= gammaln(eta_r[k] + eta_s[k] + 1) - gammaln(eta_r[k] + 1) - gammaln(eta_s[k] + 1)
+
+        # the log(n_r!) terms of the partition and the degree entropies cancel out
+        if relative:
+            return float(ds)
+        ka, kb = (self.ka - 1, self.kb) if s < self.ka else (self.ka, self.kb - 1)
+        ds += model_entropy(self.e, ka=ka, kb=kb, na=self.na, nb=self.nb, nr=False, is_bipartite=self.is_bipartite)[0]
+        ds -= model_entropy(self.e, ka=self.ka, kb=self.kb, na=self.na, nb=self.nb, nr=False,
+                            is_bipartite=self.is_bipartite)[0]
+        if s < self.ka:
+            ds += lbinom(self.na - 1, ka - 1)[0] - lbinom(self.na - 1, self.ka - 1)[0]
+        else:
+            ds += lbinom(self.nb - 1, kb - 1)[0] - lbinom(self.nb - 1, self.kb - 1)[0]
+        return float(ds)
+
+    def merge(self, r, s):
+        """Merge blocks ``r`` and ``s`` (of the same type) into block ``min(r, s)``."""
+        r, s = min(r, s), max(r, s)
+        self._check_merge(r, s)
+        self.e_rs[r] += self.e_rs[s]
+        self.e_rs[:, r] += self.e_rs[:, s]
+        self.e_rs = np.delete(np.delete(self.e_rs, s, axis=0), s, axis=1)
+        self.e_r[r] += self.e_r[s]
+        self.e_r = np.delete(self.e_r, s)
+        self.n_r[r] += self.n_r[s]
+        self.n_r = np.delete(self.n_r, s)
+        self.eta_r[r] += self.eta_r.pop(s)
+        self.mb = accept_mb_merge(self.mb, np.array([r, s], dtype=np.int_))
+        if s < self.ka:
+            self.ka -= 1
+        else:
+            self.kb -= 1
+
+    def _check_move(self, v, s):
+        assert (v < self.na) == (s < self.ka), "[ERROR] Node {} cannot be moved to block {} of the other type.".format(
+            v, s)
+
+    def _check_merge(self, r, s):
+        assert r != s, "[ERROR] Cannot merge block {} with itself.".format(r)
+        assert (s < self.ka) == (r < self.ka), "[ERROR] Blocks {} and {} are not of the same type.".format(r, s)
+
+    def _move_d_e_rs(self, v, s):
+        """Return the degree of ``v``, and the changes of the (upper triangular) :math:`e_{rs}` entries if ``v`` moves
+        to ``s``."""
+        r = self.mb[v]
+        nbrs = self._adj[self._adj_ptr[v]: self._adj_ptr[v + 1]]
+        is_loop = nbrs == v
+        d_e_rs = dict()
+
+        def _add(x, y, d):
+            key = (min(x, y), max(x, y))
+            d_e_rs[key] = d_e_rs.get(key, 0) + d
+
+        # a self-loop is listed twice at v, and adds 2 to the diagonal entry
+        n_loops = int(np.sum(is_loop))
+        if n_loops > 0:
+            _add(r, r, -n_loops)
+            _add(s, s, n_loops)
+        t_, c_ = np.unique(self.mb[nbrs[~is_loop]], return_counts=True)
+        for t, c in zip(t_, c_):
+            # a diagonal entry counts both end-points of an edge
+            _add(r, t, -c * (2 if t == r else 1))
+            _add(s, t, c * (2 if t == s else 1))
+        return self.k[v], d_e_rs
+
+
 # ###############
 # Parallelization
 # ###############
 
 
+def get_rng(seed=None):
+    """Return a random number generator.
+
+    Parameters
+    ----------
+    seed : ``int``, :class:`numpy.random.SeedSequence` or :class:`numpy.random.Generator` (optional, default: ``None``)
+        A generator is returned as is. If ``None``, the new generator is seeded from the global :mod:`numpy.random`
+        state, so that :func:`numpy.random.seed` still makes the results reproducible.
+
+    Returns
+    -------
+    rng : :class:`numpy.random.Generator`
+
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    if seed is None:
+        seed = np.random.randint(2 ** 32, dtype=np.int64)
+    return np.random.default_rng(seed)
+
+
 def loky_executor(max_workers, timeout, func, feeds):
     assert type(feeds) is list, "[ERROR] feeds should be a Python list; here it is {}".format(str(type(feeds)))
     loky_executor = get_reusable_executor(max_workers=int(max_workers), timeout=int(timeout))
@@ -1080,6 +1570,59 @@ def loky_executor(max_workers, timeout, func, feeds):
     return results
 
 
+class SharedArray(object):
+    """Read-only array that is saved once as a ``.npy`` file, and memory-mapped by each process that uses it.
+
+    Pickling only transfers the file path, so that handing the array to many loky tasks costs a few bytes, and the
+    workers share the same pages of memory. Use :func:`numpy.asarray` to get the (memory-mapped) array.
+
+    Parameters
+    ----------
+    path : ``str``
+        The ``.npy`` file.
+
+    array : :class:`numpy.ndarray` (optional, default: ``None``)
+        If given, it is saved to ``path`` first.
+
+    """
+    def __init__(self, path, array=None):
+        self.path = path
+        if array is not None:
+            np.save(path, array)
+        self._array = None
+
+    def __array__(self, dtype=None, copy=None):
+        if self._array is None:
+            self._array = np.load(self.path, mmap_mode="r")
+        if dtype is None:
+            return self._array
+        return self._array.astype(dtype, copy=False)
+
+    def __len__(self):
+        return len(np.asarray(self))
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._array = None
+
+
+def thread_executor(max_workers, func, feeds):
+    """Map ``func`` over ``feeds`` with a pool of threads.
+
+    Unlike :func:`loky_executor`, this can be nested in the (daemonic) loky workers, e.g., to run the random
+    restarts of an engine concurrently while :class:`biSBM.OptimalKs` runs its sweeps in parallel. It speeds up
+    functions that release the GIL, such as subprocess calls or ``nogil`` Numba kernels.
+
+    """
+    assert type(feeds) is list, "[ERROR] feeds should be a Python list; here it is {}".format(str(type(feeds)))
+    with ThreadPoolExecutor(max_workers=int(max_workers)) as executor:
+        results = list(executor.map(func, feeds))
+    return results
+
+
 # ##########################
 # Requires graph-tool to run
 # ##########################
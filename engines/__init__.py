@@ -31,5 +31,7 @@ structure via the statistical inference of the bipartite stochastic block model.
 """
 from engines.kl import KL
 from engines.mcmc import MCMC
+from engines.numba_kl import NumbaKL
+from engines.numba_mcmc import NumbaMCMC
 
-__all__ = ["KL", "MCMC"]
+__all__ = ["KL", "MCMC", "NumbaKL", "NumbaMCMC"]
@@ -3,10 +3,12 @@ import re
 import shutil
 import subprocess
 import hashlib
+import tempfile
 from collections import OrderedDict
-import random
 import numpy as np
 
+from biSBM.utils import thread_executor
+
 
 class KL(object):
     """Base class for the Kernighan-Lin algorithm.
@@ -39,6 +41,8 @@ class KL(object):
     kl_verbose : ``bool`` (required, default: ``True``)
 
     kl_is_parallel : ``bool`` (required, default: ``False``)
+        Whether to run the ``<kl_itertimes>`` KL runs concurrently (in separate ``<outputFOLDER>`` sub-folders), with
+        ``<n_cores>`` threads. This also works when :class:`biSBM.OptimalKs` computes the sweeps in parallel.
 
     """
     def __init__(self,
@@ -64,9 +68,6 @@ class KL(object):
         # during each engine run (Note that there are <n_sweeps> engines running in parallel via loky)
         self.MAX_KL_NUM_SWEEPS = int(kl_itertimes)
 
-        if self.KL_PARALLELIZATION:
-            raise NotImplementedError("[ERROR] KL calculation accross many cores is not supported.")
-
         # for KL
         if not os.path.isfile(f_engine):
             raise BaseException("[ERROR] KL engine binary not found!")
@@ -105,14 +106,8 @@ class KL(object):
         except OSError:
             pass
         finally:
-            self.f_kl_output += "/" + hashlib.md5(str(random.random()).encode()).hexdigest()
-            try:
-                os.mkdir(self.f_kl_output)
-            except OSError:
-                # clear the working dir, and mkdir a new one
-                shutil.rmtree(self.f_kl_output, ignore_errors=True)
-                os.mkdir(self.f_kl_output)
-                pass
+            # a new working dir, named without drawing from the global random state (which may be seeded)
+            self.f_kl_output = tempfile.mkdtemp(dir=self.f_kl_output)
 
         filename = hashlib.md5(f_edgelist.encode()).hexdigest()
         f_edgelist_1_indexed = self.f_kl_output + "/" + filename + "_1-indexed.edgelist"
@@ -136,7 +131,7 @@ class KL(object):
 
         return action_str
 
-    def engine(self, f_edgelist, na, nb, ka, kb, mb=None):  # TODO: bug when assigned verbose=False
+    def engine(self, f_edgelist, na, nb, ka, kb, mb=None, seed=None):  # TODO: bug when assigned verbose=False
         """Run the shell code.
 
         Parameters
@@ -147,6 +142,9 @@ class KL(object):
         kb : ``int`` (required)
             Number of communities for type-`b` nodes to partition.
 
+        seed : (optional, default: ``None``)
+            Not used, since the program has no option for it; present for compatibility with the other engines.
+
         Returns
         -------
         of_group : ``list[int]``
@@ -164,9 +162,9 @@ class KL(object):
         else:
             stdout = subprocess.PIPE
 
-        def run(_):
+        def run(action):
             p = subprocess.Popen(
-                action_str.split(' '),
+                action,
                 bufsize=2048,
                 stdout=stdout
             )
@@ -174,23 +172,35 @@ class KL(object):
             p.wait()
             return out, err, p
 
+        def run_in_folder(ind):
+            # each concurrent run writes to its own sub-folder, as its first (and only) output
+            f_kl_output = self.f_kl_output + "/" + str(ind)
+            os.mkdir(f_kl_output)
+            action = action_str.split(' ')
+            action[3] = f_kl_output
+            while True:
+                out, err, p = run(action)
+                if p.returncode == -11:  # when Exception raises from the KL code
+                    raise RuntimeError("[ERROR] Exception from C++ program during inference! -- " + ' '.join(action))
+                elif p.returncode == 0:
+                    return self._get_score_by_index(1, f_kl_output), self._get_of_group_by_index(1, f_kl_output)
+
         kl_output = OrderedDict()
-        num_sweep_ = 0
-        while num_sweep_ < num_sweeps_:
-            if not parallelization_:
-                out, err, p = run("")
+        if not parallelization_:
+            num_sweep_ = 0
+            while num_sweep_ < num_sweeps_:
+                out, err, p = run(action_str.split(' '))
                 if p.returncode == -11:  # when Exception raises from the KL code
                     raise RuntimeError("[ERROR] Exception from C++ program during inference! -- " + action_str)
                 elif p.returncode == 0:
                     num_sweep_ += 1
                     assert type(self._get_score_by_index(num_sweep_)) == float
                     kl_output[self._get_score_by_index(num_sweep_)] = self._get_of_group_by_index(num_sweep_)
-
-            else:  # spawn processes across cores, collect results, and return the best option
-                # However, in optimalks.py main code, we may calculate each single point in parallel, which
-                # might raise "AssertionError: daemonic processes are not allowed to have children"
-                # TODO: For now, parallel calculation for KL is disabled. (Fix it?)
-                raise NotImplementedError
+        else:
+            # spawn subprocesses from threads, collect results, and return the best option; threads (unlike
+            # processes) may be spawned from the daemonic loky workers, when OptimalKs runs the sweeps in parallel
+            for score, of_group in thread_executor(num_cores_, run_in_folder, list(range(num_sweeps_))):
+                kl_output[score] = of_group
 
         of_group = kl_output[max(kl_output)]
 
@@ -204,32 +214,36 @@ class KL(object):
         types = [1] * int(na) + [2] * int(nb)
         return types
 
-    def _get_of_group_by_index(self, num_sweep_):
+    def _get_of_group_by_index(self, num_sweep_, f_kl_output=None):
         of_group = []
-        f = self._open_biDCSBMcomms_file(num_sweep_)
+        f = self._open_biDCSBMcomms_file(num_sweep_, f_kl_output)
         for ind, line in enumerate(f):
             of_group.append(int(line.split('\n')[0]))
         f.close()
         return of_group
 
-    def _get_score_by_index(self, num_sweep_):
-        f = self._get_bisbm_score_file(num_sweep_)
+    def _get_score_by_index(self, num_sweep_, f_kl_output=None):
+        f = self._get_bisbm_score_file(num_sweep_, f_kl_output)
         for ind, line in enumerate(f):
             score = float(line.split('\n')[0])
         f.close()
         return score
 
-    def _get_bisbm_score_file(self, num_sweep_):
+    def _get_bisbm_score_file(self, num_sweep_, f_kl_output=None):
         """:return: file handle"""
+        if f_kl_output is None:
+            f_kl_output = self.f_kl_output
         f = open(
-            self.f_kl_output + '/biDCSBMcomms' + str(int(num_sweep_)) + '.score', 'r'
+            f_kl_output + '/biDCSBMcomms' + str(int(num_sweep_)) + '.score', 'r'
         )
         return f
 
-    def _open_biDCSBMcomms_file(self, num_sweep_):
+    def _open_biDCSBMcomms_file(self, num_sweep_, f_kl_output=None):
         """:return: file handle"""
+        if f_kl_output is None:
+            f_kl_output = self.f_kl_output
         f = open(
-            self.f_kl_output + '/biDCSBMcomms' +
+            f_kl_output + '/biDCSBMcomms' +
             str(int(num_sweep_)) + '.tsv', 'r'
         )
         return f
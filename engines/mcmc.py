@@ -160,7 +160,8 @@ class MCMC(object):
         #print(action_str)
         return action_str
 
-    def engine(self, f_edgelist, na, nb, ka, kb, mb=None, method=None):  # TODO: bug when assigned verbose=False
+    def engine(self, f_edgelist, na, nb, ka, kb, mb=None, method=None,
+               seed=None):  # TODO: bug when assigned verbose=False
         """Run the shell code.
 
         Parameters
@@ -181,6 +182,9 @@ class MCMC(object):
 
         method :
 
+        seed : (optional, default: ``None``)
+            Not used, since the program has no option for it; present for compatibility with the other engines.
+
         Returns
         -------
         of_group : :class:`numpy.ndarray`
@@ -0,0 +1,260 @@
+import numpy as np
+from numba import njit
+from math import log
+
+from engines.kl import KL
+from biSBM.ioutils import get_edgelist
+from biSBM.utils import gen_equal_bipartite_partition, get_rng, thread_executor
+
+
+class NumbaKL(KL):
+    """In-process Kernighan-Lin algorithm, compiled with Numba.
+
+    This engine has the same interface as :class:`engines.KL`, but runs on the edgelist array directly, without an
+    external binary or scratch directories. It maximizes the same (degree-corrected) objective as the binary,
+
+    .. math::
+
+        \\mathcal{L} = \\sum_{r \\in a, s \\in b} e_{rs} \\ln \\frac{e_{rs}}{\\kappa_r \\kappa_s},
+
+    where :math:`\\kappa_r` is the sum of degrees of the nodes in block :math:`r`. Starting from a random partition,
+    each pass moves every node exactly once, always choosing the best single-node move among the nodes not moved yet
+    (even if it decreases :math:`\\mathcal{L}`), and then rolls back to the best partition of the pass. Passes are
+    repeated until :math:`\\mathcal{L}` stops increasing. Moves that would empty a block are not allowed.
+
+    Parameters
+    ----------
+    n_sweeps : ``int`` (required, default: ``1``)
+        Number of partitioning computations for each :math:`(K_a, K_b)` data point.
+
+    is_parallel : ``bool`` (required, default: ``False``)
+
+    n_cores : ``int`` (required, default: ``1``)
+
+    algm_name : ``str`` (required, default: ``kl``)
+
+    kl_steps : ``int`` (required, default: ``5``)
+        Number of random initializations.
+
+    kl_itertimes : ``int`` (required, default: ``1``)
+        Number of KL runs (of ``kl_steps`` random initializations each) for returning an optimal result.
+
+    kl_verbose : ``bool`` (required, default: ``True``)
+
+    kl_is_parallel : ``bool`` (required, default: ``False``)
+        Whether to run the random initializations concurrently, with ``n_cores`` threads (the compiled kernel releases
+        the GIL). This also works when :class:`biSBM.OptimalKs` computes the sweeps in parallel.
+
+    """
+    def __init__(self,
+                 n_sweeps=1,
+                 is_parallel=False,
+                 n_cores=1,
+                 algm_name="kl",
+                 kl_steps=5,
+                 kl_itertimes=1,
+                 kl_verbose=True,
+                 kl_is_parallel=False):
+
+        self.MAX_NUM_SWEEPS = int(n_sweeps)
+        self.PARALLELIZATION = bool(is_parallel)
+        self.NUM_CORES = int(n_cores)
+        self.KL_PARALLELIZATION = bool(kl_is_parallel)
+        self.ALGM_NAME = str(algm_name)
+        self.IN_MEMORY = True
+
+        self.MAX_KL_NUM_SWEEPS = int(kl_itertimes)
+
+        self.kl_steps = int(kl_steps)
+        self.kl_verbose = bool(kl_verbose)
+
+        pass
+
+    def engine(self, f_edgelist, na, nb, ka, kb, mb=None, seed=None):
+        """Run the Kernighan-Lin algorithm from ``kl_steps * kl_itertimes`` random partitions.
+
+        Parameters
+        ----------
+        f_edgelist : :class:`numpy.ndarray` or ``str``
+            The edgelist array, or the path to an edgelist file.
+
+        na : ``int``
+
+        nb : ``int``
+
+        ka : ``int`` (required)
+            Number of communities for type-`a` nodes to partition.
+
+        kb : ``int`` (required)
+            Number of communities for type-`b` nodes to partition.
+
+        mb : :class:`numpy.ndarray` (optional, default: ``None``)
+            Not used; present for compatibility with the other engines.
+
+        seed : (optional, default: ``None``)
+            Seed of the random initializations; an ``int``, a :class:`numpy.random.SeedSequence` or a
+            :class:`numpy.random.Generator`; see :func:`biSBM.utils.get_rng`.
+
+        Returns
+        -------
+        of_group : :class:`numpy.ndarray`
+            The partition with the highest score.
+
+        """
+        if isinstance(f_edgelist, str):
+            edgelist = get_edgelist(f_edgelist)
+        else:
+            edgelist = np.asarray(f_edgelist, dtype=np.int_)
+        na, nb, ka, kb = int(na), int(nb), int(ka), int(kb)
+        assert na > 0, "[ERROR] Number of type-a nodes = 0, which is not allowed"
+        assert nb > 0, "[ERROR] Number of type-b nodes = 0, which is not allowed"
+
+        n = na + nb
+        sources = np.concatenate((edgelist[:, 0], edgelist[:, 1]))
+        targets = np.concatenate((edgelist[:, 1], edgelist[:, 0]))
+        adj = targets[np.argsort(sources, kind="stable")]
+        adj_ptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=n))))
+
+        # draw the initial partitions upfront, so that the result does not depend on the scheduling of the threads
+        rng = get_rng(seed)
+        mbs = []
+        for _ in range(self.MAX_KL_NUM_SWEEPS * self.kl_steps):
+            mb = gen_equal_bipartite_partition(na, nb, ka, kb)
+            rng.shuffle(mb[:na])
+            rng.shuffle(mb[na:])
+            mbs += [mb]
+
+        def run(mb):
+            return _kl(adj_ptr, adj, mb, na, ka, kb)
+
+        if self.KL_PARALLELIZATION:
+            results = thread_executor(self.NUM_CORES, run, mbs)
+        else:
+            results = [run(mb) for mb in mbs]
+        # the first of the best-scoring partitions
+        return max(results, key=lambda x: x[1])[0]
+
+
+@njit(cache=True)
+def _xlogx(x):
+    if x > 0:
+        return x * log(x)
+    return 0.
+
+
+@njit(cache=True)
+def _move(v, s, mb, e_rs, x_rs, kappa, n_r, m_vs, adj_ptr, adj, lo, hi):
+    """Move node ``v`` to block ``s``; the neighbors of ``v`` are in the blocks ``lo, ..., hi - 1``."""
+    r = mb[v]
+    for t in range(lo, hi):
+        m = m_vs[v, t]
+        e_rs[r, t] -= m
+        e_rs[t, r] -= m
+        e_rs[s, t] += m
+        e_rs[t, s] += m
+        x_rs[r, t] = x_rs[t, r] = _xlogx(e_rs[r, t])
+        x_rs[s, t] = x_rs[t, s] = _xlogx(e_rs[s, t])
+    deg = adj_ptr[v + 1] - adj_ptr[v]
+    kappa[r] -= deg
+    kappa[s] += deg
+    n_r[r] -= 1
+    n_r[s] += 1
+    for i in range(adj_ptr[v], adj_ptr[v + 1]):
+        m_vs[adj[i], r] -= 1
+        m_vs[adj[i], s] += 1
+    mb[v] = s
+
+
+@njit(cache=True, nogil=True)
+def _kl(adj_ptr, adj, mb, na, ka, kb):
+    n = len(mb)
+    k = ka + kb
+    e_rs = np.zeros((k, k), dtype=np.int64)
+    kappa = np.zeros(k, dtype=np.int64)
+    n_r = np.zeros(k, dtype=np.int64)
+    # number of edges between each node and each block
+    m_vs = np.zeros((n, k), dtype=np.int64)
+    for v in range(n):
+        n_r[mb[v]] += 1
+        for i in range(adj_ptr[v], adj_ptr[v + 1]):
+            m_vs[v, mb[adj[i]]] += 1
+            e_rs[mb[v], mb[adj[i]]] += 1
+        kappa[mb[v]] += adj_ptr[v + 1] - adj_ptr[v]
+
+    # cached e_rs * ln(e_rs)
+    x_rs = np.zeros((k, k))
+    for r in range(k):
+        for s in range(k):
+            x_rs[r, s] = _xlogx(e_rs[r, s])
+
+    score = 0.
+    for r in range(ka):
+        for s in range(ka, k):
+            score += _xlogx(e_rs[r, s])
+    for r in range(k):
+        score -= _xlogx(kappa[r])
+
+    locked = np.zeros(n, dtype=np.bool_)
+    journal_v = np.empty(n, dtype=np.int64)
+    journal_r = np.empty(n, dtype=np.int64)
+    improved = True
+    while improved:
+        locked[:] = False
+        pass_score = score
+        best_score = score
+        n_best = 0
+        n_moves = 0
+        for _ in range(n):
+            best_d = -np.inf
+            best_v = -1
+            best_s = -1
+            for v in range(n):
+                r = mb[v]
+                if locked[v] or n_r[r] == 1:
+                    continue
+                if v < na:
+                    lo, hi, lo_, hi_ = 0, ka, ka, k
+                else:
+                    lo, hi, lo_, hi_ = ka, k, 0, ka
+                deg = adj_ptr[v + 1] - adj_ptr[v]
+                d_r = _xlogx(kappa[r]) - _xlogx(kappa[r] - deg)
+                for t in range(lo_, hi_):
+                    m = m_vs[v, t]
+                    if m > 0:
+                        d_r += _xlogx(e_rs[r, t] - m) - x_rs[r, t]
+                for s in range(lo, hi):
+                    if s == r:
+                        continue
+                    d = d_r + _xlogx(kappa[s]) - _xlogx(kappa[s] + deg)
+                    for t in range(lo_, hi_):
+                        m = m_vs[v, t]
+                        if m > 0:
+                            d += _xlogx(e_rs[s, t] + m) - x_rs[s, t]
+                    if d > best_d:
+                        best_d, best_v, best_s = d, v, s
+            if best_v == -1:
+                break
+            journal_v[n_moves] = best_v
+            journal_r[n_moves] = mb[best_v]
+            if best_v < na:
+                _move(best_v, best_s, mb, e_rs, x_rs, kappa, n_r, m_vs, adj_ptr, adj, ka, k)
+            else:
+                _move(best_v, best_s, mb, e_rs, x_rs, kappa, n_r, m_vs, adj_ptr, adj, 0, ka)
+            locked[best_v] = True
+            n_moves += 1
+            score += best_d
+            if score > best_score + 1e-10:
+                best_score = score
+                n_best = n_moves
+
+        # roll back to the best partition of this pass
+        for i in range(n_moves - 1, n_best - 1, -1):
+            v = journal_v[i]
+            if v < na:
+                _move(v, journal_r[i], mb, e_rs, x_rs, kappa, n_r, m_vs, adj_ptr, adj, ka, k)
+            else:
+                _move(v, journal_r[i], mb, e_rs, x_rs, kappa, n_r, m_vs, adj_ptr, adj, 0, ka)
+        score = best_score
+        improved = best_score > pass_score + 1e-10
+
+    return mb, score
@@ -0,0 +1,463 @@
+import heapq
+from collections import defaultdict
+import numpy as np
+from numba import njit
+from math import lgamma, exp, log
+
+from engines.mcmc import MCMC
+from biSBM.ioutils import get_edgelist
+from biSBM.utils import BlockState, assemble_merge_candidates, gen_equal_bipartite_partition, get_rng, \
+    init_q_cache
+
+_COOLING = {
+    "abrupt_cool": 0,
+    "constant": 1,
+    "exponential": 2,
+    "linear": 3,
+    "logarithmic": 4,
+    "logarithm": 4,
+}
+
+
+class NumbaMCMC(MCMC):
+    """In-process Markov chain Monte Carlo algorithm, compiled with Numba.
+
+    This engine has the same interface (and the same setters) as :class:`engines.MCMC`, but runs on the edgelist
+    array directly, without an external binary or temporary files. The chain minimizes the (microcanonical,
+    degree-corrected) adjacency entropy at fixed :math:`(K_a, K_b)`, via single-node moves with the
+    :math:`\\epsilon`-smart proposals of [peixoto-efficient-2014]_ and the Metropolis-Hastings criterion. Moves that
+    would empty a block are rejected. The best partition visited is returned.
+
+    Unless it is warm-started with a partition that has enough blocks, the chain first runs with twice as many blocks
+    (at most the number of nodes), which are then merged down greedily before the final run at :math:`(K_a, K_b)`.
+
+    Parameters
+    ----------
+    n_sweeps : ``int`` (required, default: `1`)
+        Number of partitioning computations for each :math:`(K_a, K_b)` data point.
+
+    is_parallel : ``bool`` (required, default: `False`)
+        Whether to compute the partitioning in parallel.
+
+    n_cores : ``int`` (required, default: `1`)
+        The number of cores used when `is_parallel is True`.
+
+    algm_name : ``str`` (required, default: `mcmc`)
+        The name of the algorithm.
+
+    mcmc_steps : ``int`` (required, default: `1e5`)
+        Maximal number of move attempts.
+
+    mcmc_await_steps : ``int`` (required, default: `2e3`)
+        Number of move attempts to wait for a record-breaking event. The algorithm will stop if there is no
+        record-breaking event within the interval or the overall attempts exceed ``mcmc_steps``, whichever happens
+        earlier.
+
+    mcmc_cooling : ``str`` (required, default: `abrupt_cool`)
+        Annealing scheme used, where the temperature :math:`T` at move attempt :math:`t` (or :math:`s = t / N` sweeps)
+        is, with :math:`c_1` and :math:`c_2` the cooling parameters,
+
+        1. ``abrupt_cool``: :math:`T = 1` if :math:`t < c_1`, and :math:`T = 0` afterwards,
+        2. ``constant``: :math:`T = c_1`,
+        3. ``exponential``: :math:`T = c_1 c_2^s`,
+        4. ``linear``: :math:`T = \\max(c_1 (1 - c_2 s), 0)`,
+        5. ``logarithmic``: :math:`T = c_1 / \\ln(e + c_2 s)`.
+
+        At :math:`T = 0`, only moves that decrease the entropy are accepted.
+
+    mcmc_cooling_param_1 : ``int`` (required, default: `1e3`)
+        Parameter 1 for the annealing.
+
+    mcmc_cooling_param_2 : ``float`` (required, default: `0.1`)
+        Parameter 2 for the annealing.
+
+    mcmc_epsilon : ``float`` (required, default: `1.`)
+        The :math:`\\epsilon` parameter used in the proposal moves.
+
+    References
+    ----------
+    .. [peixoto-efficient-2014] Tiago P. Peixoto, "Efficient Monte Carlo and greedy heuristic for the inference of
+       stochastic block models", Phys. Rev. E 89, 012804 (2014), :doi:`10.1103/PhysRevE.89.012804`,
+       :arxiv:`1310.4378`
+
+    """
+    def __init__(self,
+                 n_sweeps=1,
+                 is_parallel=False,
+                 n_cores=1,
+                 algm_name="mcmc",
+                 mcmc_steps=1e5,
+                 mcmc_await_steps=2e3,
+                 mcmc_cooling="abrupt_cool",
+                 mcmc_cooling_param_1=1e3,
+                 mcmc_cooling_param_2=0.1,
+                 mcmc_epsilon=1.):
+
+        self.MAX_NUM_SWEEPS = int(n_sweeps)
+        self.PARALLELIZATION = bool(is_parallel)
+        self.NUM_CORES = int(n_cores)
+        self.ALGM_NAME = str(algm_name)
+        self.IN_MEMORY = True
+
+        self.mcmc_steps_ = int(mcmc_steps)
+        self.mcmc_await_steps_ = int(mcmc_await_steps)
+        self.mcmc_cooling_ = str(mcmc_cooling)
+        self.mcmc_cooling_param_1 = mcmc_cooling_param_1
+        self.mcmc_cooling_param_2 = mcmc_cooling_param_2
+        self.mcmc_epsilon_ = mcmc_epsilon
+
+        pass
+
+    def engine(self, f_edgelist, na, nb, ka, kb, mb=None, method=None, seed=None):
+        """Run the Markov chain.
+
+        Parameters
+        ----------
+        f_edgelist : :class:`numpy.ndarray` or ``str``
+            The edgelist array, or the path to an edgelist file.
+
+        na : ``int``
+
+        nb : ``int``
+
+        ka : ``int``, required
+            Number of communities for type-*a* nodes to partition.
+
+        kb : ``int``, required
+            Number of communities for type-*b* nodes to partition.
+
+        mb : :class:`numpy.ndarray` (optional, default: ``None``)
+            Partition to start from (possibly with a different number of blocks). If ``None``, start from a random
+            partition.
+
+        method : ``str`` (optional, default: ``None``)
+            If ``"natural"``, ignore ``(ka, kb)`` and merge blocks for as long as the description length decreases;
+            the returned array is then prefixed with the resulting ``ka`` and ``kb``.
+
+        seed : (optional, default: ``None``)
+            Seed of the initial partition and of the chain; an ``int``, a :class:`numpy.random.SeedSequence` or a
+            :class:`numpy.random.Generator`; see :func:`biSBM.utils.get_rng`.
+
+        Returns
+        -------
+        of_group : :class:`numpy.ndarray`
+
+        """
+        if cooling_code(self.mcmc_cooling_) is None:
+            raise ValueError("[ERROR] Unknown cooling schedule {}.".format(self.mcmc_cooling_))
+        if isinstance(f_edgelist, str):
+            edgelist = get_edgelist(f_edgelist)
+        else:
+            edgelist = np.asarray(f_edgelist, dtype=np.int_)
+        na, nb = int(na), int(nb)
+        rng = get_rng(seed)
+
+        if method == "natural":
+            return self._natural_merge(edgelist, na, nb, rng)
+
+        ka, kb = int(ka), int(kb)
+        if mb is None:
+            # coarse-to-fine: sample with twice as many blocks first, and merge them down; this escapes most of the
+            # local minima (e.g., two planted blocks lumped together, and another one split) of single-node moves
+            ka_, kb_ = min(2 * ka, na), min(2 * kb, nb)
+            mb = gen_equal_bipartite_partition(na, nb, ka_, kb_)
+            rng.shuffle(mb[:na])
+            rng.shuffle(mb[na:])
+            mb = self._run_chain(edgelist, mb, na, ka_, kb_, rng)
+        else:
+            mb = np.array(mb, dtype=np.int_)
+            ka_ = int(np.max(mb[:na])) + 1
+            kb_ = int(np.max(mb)) + 1 - ka_
+            if ka_ < ka or kb_ < kb:
+                ka_ = min(2 * ka, na) if ka_ < ka else ka_
+                kb_ = min(2 * kb, nb) if kb_ < kb else kb_
+                mb = fit_mb_to_k(edgelist, mb, na, nb, ka_, kb_, rng=rng)
+                mb = self._run_chain(edgelist, mb, na, ka_, kb_, rng)
+        mb = fit_mb_to_k(edgelist, mb, na, nb, ka, kb, rng=rng)
+        return self._run_chain(edgelist, mb, na, ka, kb, rng)
+
+    def _run_chain(self, edgelist, mb, na, ka, kb, rng):
+        n = len(mb)
+        sources = np.concatenate((edgelist[:, 0], edgelist[:, 1]))
+        targets = np.concatenate((edgelist[:, 1], edgelist[:, 0]))
+        adj = targets[np.argsort(sources, kind="stable")]
+        adj_ptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=n))))
+
+        k = ka + kb
+        b_s, b_t = mb[edgelist[:, 0]], mb[edgelist[:, 1]]
+        e_rs = np.bincount(np.concatenate((b_s * k + b_t, b_t * k + b_s)), minlength=k * k).reshape(k, k)
+        return _mcmc(adj_ptr, adj, np.array(mb, dtype=np.int_), e_rs, na, ka, kb, float(self.mcmc_epsilon_),
+                     self.mcmc_steps_, self.mcmc_await_steps_, cooling_code(self.mcmc_cooling_),
+                     float(self.mcmc_cooling_param_1), float(self.mcmc_cooling_param_2), rng.integers(2 ** 31))
+
+    def _natural_merge(self, edgelist, na, nb, rng):
+        """Run the chain at :math:`K_a = K_b = \\lceil \\sqrt{E} \\rceil` (at most the number of nodes), then merge the
+        blocks greedily for as long as the description length decreases."""
+        k = int(np.ceil(len(edgelist) ** 0.5))
+        ka, kb = min(k, na), min(k, nb)
+        mb = gen_equal_bipartite_partition(na, nb, ka, kb)
+        rng.shuffle(mb[:na])
+        rng.shuffle(mb[na:])
+        mb = self._run_chain(edgelist, mb, na, ka, kb, rng)
+        state = BlockState(edgelist, mb, na, nb, ka, kb, q_cache=init_q_cache(min(len(edgelist), int(1e4))))
+        merged = True
+        while merged and state.ka + state.kb > 2:
+            if state.ka + state.kb <= 100:
+                mlists = assemble_merge_candidates(state.ka, state.kb)
+            else:
+                mlists = assemble_merge_candidates(state.ka, state.kb, nm=10, rng=rng)
+            ds = np.array([state.virtual_merge_ds(r, s) for r, s in mlists])
+            # apply the best disjoint merges of this round, re-evaluated on the updated state
+            label = np.arange(state.ka + state.kb)
+            touched = set()
+            merged = False
+            for idx in np.argsort(ds):
+                if ds[idx] >= 0:
+                    break
+                r, s = mlists[idx]
+                if r in touched or s in touched:
+                    continue
+                touched.update((r, s))
+                r_, s_ = label[r], label[s]
+                if state.virtual_merge_ds(r_, s_) < 0:
+                    state.merge(r_, s_)
+                    label[label == s_] = r_
+                    label[label > s_] -= 1
+                    merged = True
+        return np.concatenate(([state.ka, state.kb], state.mb)).astype(np.int_)
+
+
+def cooling_code(cooling):
+    return _COOLING.get(cooling)
+
+
+def fit_mb_to_k(edgelist, mb, na, nb, ka, kb, rng=None):
+    """Adapt a partition to :math:`(K_a, K_b)` blocks, to warm-start a chain.
+
+    Blocks are merged greedily (the merge that least increases the description length first) if there are too many,
+    and the largest blocks are split in random halves if there are too few.
+
+    Parameters
+    ----------
+    edgelist : :class:`numpy.ndarray`
+
+    mb : :class:`numpy.ndarray`
+        Partition :math:`b` of nodes into blocks.
+
+    na : ``int``
+
+    nb : ``int``
+
+    ka : ``int``
+
+    kb : ``int``
+
+    rng : :class:`numpy.random.Generator` (optional, default: ``None``)
+        See :func:`biSBM.utils.get_rng`.
+
+    Returns
+    -------
+    mb : :class:`numpy.ndarray`
+
+    """
+    rng = get_rng(rng)
+    mb = np.array(mb, dtype=np.int_)
+    ka_ = int(np.max(mb[:na])) + 1
+    kb_ = int(np.max(mb)) + 1 - ka_
+    if ka_ > ka or kb_ > kb:
+        state = BlockState(edgelist, mb, na, nb, ka_, kb_, q_cache=init_q_cache(0))
+        _merge_down(state, True, ka, rng)
+        _merge_down(state, False, kb, rng)
+        mb = state.mb
+        ka_, kb_ = state.ka, state.kb
+    mb[na:] += ka - ka_  # make room for type-a blocks that will be split off
+    for lo, hi, k_, k in [(0, na, ka_, ka), (na, na + nb, kb_, kb)]:
+        offset = 0 if lo == 0 else ka
+        for new_r in range(k_, k):
+            n_r = np.bincount(mb[lo:hi] - offset, minlength=k_)
+            r = np.argmax(n_r)
+            nodes = np.flatnonzero(mb[lo:hi] == r + offset) + lo
+            rng.shuffle(nodes)
+            mb[nodes[: len(nodes) // 2]] = new_r + offset
+            k_ += 1
+    return mb
+
+
+def _merge_down(state, is_a, k, rng):
+    """Merge the blocks of one type of ``state`` greedily, the merge that least increases the description length
+    first, until there are at most ``k``.
+
+    The candidate merges are all the pairs of blocks of the type, or 10 random partners per block if there are more
+    than 100 of them. Their changes of the description length are kept in a heap, and only those that involve the
+    merged block are re-evaluated after a merge; see :func:`biSBM.utils.BlockState.virtual_merge_ds`.
+
+    """
+    # blocks are named after their label at the start, and `label` maps the names to the current labels
+    lo = 0 if is_a else state.ka
+    label = np.arange(state.ka + state.kb)
+    alive = set(range(lo, lo + (state.ka if is_a else state.kb)))
+    while len(alive) > k:
+        # the candidates are drawn again if the sampled ones run out before there are `k` blocks
+        names = np.array(sorted(alive))
+        pairs = assemble_merge_candidates(len(names), 0, nm=None if len(names) <= 100 else 10, rng=rng)
+        partners = defaultdict(set)
+        ds = dict()
+        for u, v in names[pairs].tolist():
+            partners[u].add(v)
+            partners[v].add(u)
+            ds[u, v] = state.virtual_merge_ds(label[u], label[v], relative=True)
+        heap = [(ds_, u, v) for (u, v), ds_ in ds.items()]
+        heapq.heapify(heap)
+        while heap and len(alive) > k:
+            ds_, u, v = heapq.heappop(heap)
+            if ds.get((u, v)) != ds_:
+                continue  # outdated
+            # the merged block keeps the lower label, i.e., `u`
+            r, s = label[u], label[v]
+            state.merge(r, s)
+            label[label == s] = r
+            label[label > s] -= 1
+            alive.discard(v)
+            for w in partners.pop(v):
+                ds.pop((min(v, w), max(v, w)))
+                partners[w].discard(v)
+                if w != u:
+                    partners[w].add(u)
+                    partners[u].add(w)
+            for w in partners[u]:
+                key = min(u, w), max(u, w)
+                ds[key] = state.virtual_merge_ds(label[u], label[w], relative=True)
+                heapq.heappush(heap, (ds[key],) + key)
+
+
+@njit(cache=True)
+def _temperature(cooling, t, n, c1, c2):
+    s = t / n
+    if cooling == 0:
+        return 1. if t < c1 else 0.
+    elif cooling == 1:
+        return c1
+    elif cooling == 2:
+        return c1 * c2 ** s
+    elif cooling == 3:
+        return max(c1 * (1 - c2 * s), 0.)
+    else:
+        return c1 / log(np.e + c2 * s)
+
+
+@njit(cache=True)
+def _mcmc(adj_ptr, adj, mb, e_rs, na, ka, kb, epsilon, steps, await_steps, cooling, c1, c2, seed):
+    np.random.seed(seed)
+    n = len(mb)
+    k = ka + kb
+    e_r = np.zeros(k, dtype=np.int64)
+    n_r = np.zeros(k, dtype=np.int64)
+    for r in range(k):
+        e_r[r] = np.sum(e_rs[r])
+    for v in range(n):
+        n_r[mb[v]] += 1
+
+    m_vt = np.zeros(k, dtype=np.int64)
+    blocks = np.empty(k, dtype=np.int64)
+    # moves since the last record, replayed onto `best_mb` whenever a new record is set
+    best_mb = mb.copy()
+    journal_v = np.empty(1024, dtype=np.int64)
+    journal_s = np.empty(1024, dtype=np.int64)
+    n_journal = 0
+    ent = 0.
+    best_ent = 0.
+    last_record = 0
+
+    for t in range(steps):
+        if t - last_record > await_steps:
+            break
+        v = np.random.randint(n)
+        r = mb[v]
+        if n_r[r] == 1:
+            continue
+        if v < na:
+            lo, hi = 0, ka
+        else:
+            lo, hi = ka, k
+        n_blocks = hi - lo
+        if n_blocks == 1:
+            continue
+        deg = adj_ptr[v + 1] - adj_ptr[v]
+
+        # propose a block, guided by the block of a random neighbor
+        if deg == 0:
+            s = lo + np.random.randint(n_blocks)
+        else:
+            t_ = mb[adj[adj_ptr[v] + np.random.randint(deg)]]
+            if np.random.random() < epsilon * n_blocks / (e_r[t_] + epsilon * n_blocks):
+                s = lo + np.random.randint(n_blocks)
+            else:
+                x = np.random.random() * e_r[t_]
+                s = lo
+                acc = e_rs[t_, s]
+                while acc <= x and s < hi - 1:
+                    s += 1
+                    acc += e_rs[t_, s]
+        if s == r:
+            continue
+
+        n_distinct = 0
+        for i in range(adj_ptr[v], adj_ptr[v + 1]):
+            t_ = mb[adj[i]]
+            if m_vt[t_] == 0:
+                blocks[n_distinct] = t_
+                n_distinct += 1
+            m_vt[t_] += 1
+
+        d_ent = lgamma(e_r[r] - deg + 1) - lgamma(e_r[r] + 1) + lgamma(e_r[s] + deg + 1) - lgamma(e_r[s] + 1)
+        p_fwd = 0.
+        p_bwd = 0.
+        for i in range(n_distinct):
+            t_ = blocks[i]
+            m = m_vt[t_]
+            d_ent -= lgamma(e_rs[r, t_] - m + 1) - lgamma(e_rs[r, t_] + 1)
+            d_ent -= lgamma(e_rs[s, t_] + m + 1) - lgamma(e_rs[s, t_] + 1)
+            p_fwd += m * (e_rs[t_, s] + epsilon) / (e_r[t_] + epsilon * n_blocks)
+            p_bwd += m * (e_rs[t_, r] - m + epsilon) / (e_r[t_] + epsilon * n_blocks)
+
+        temp = _temperature(cooling, t, n, c1, c2)
+        if temp == 0.:
+            accept = d_ent < 0
+        else:
+            a = -d_ent / temp
+            if deg > 0:
+                a += log(p_bwd) - log(p_fwd)
+            accept = a >= 0 or np.random.random() < exp(a)
+
+        if accept:
+            for i in range(n_distinct):
+                t_ = blocks[i]
+                m = m_vt[t_]
+                e_rs[r, t_] -= m
+                e_rs[t_, r] -= m
+                e_rs[s, t_] += m
+                e_rs[t_, s] += m
+            e_r[r] -= deg
+            e_r[s] += deg
+            n_r[r] -= 1
+            n_r[s] += 1
+            mb[v] = s
+            ent += d_ent
+
+            if n_journal == len(journal_v):
+                journal_v = np.concatenate((journal_v, np.empty(n_journal, dtype=np.int64)))
+                journal_s = np.concatenate((journal_s, np.empty(n_journal, dtype=np.int64)))
+            journal_v[n_journal] = v
+            journal_s[n_journal] = s
+            n_journal += 1
+            if ent < best_ent - 1e-8:
+                best_ent = ent
+                last_record = t
+                for i in range(n_journal):
+                    best_mb[journal_v[i]] = journal_s[i]
+                n_journal = 0
+
+        for i in range(n_distinct):
+            m_vt[blocks[i]] = 0
+
+    return best_mb
@@ -0,0 +1,143 @@
+import os
+import pickle
+import random
+import numpy as np
+import biSBM as bm
+from biSBM.bookkeeping import ArrayStore, Checkpoint, MemoryBudget, ResultCache
+from biSBM.utils import MergedPartition
+
+
+def test_array_store_round_trip():
+    store = ArrayStore()
+    mb = np.repeat(np.arange(300), 10)
+    store[(2, 3)] = mb
+    store[(1, 1)] = np.array([[0, 5], [5, 0]])
+    assert store._entries[(2, 3)].data[0] == np.uint16
+    assert store.nbytes < mb.nbytes / 10
+    assert store[(2, 3)].dtype == np.int_ and np.array_equal(store[(2, 3)], mb)
+    assert list(store) == [(2, 3), (1, 1)]
+    store[(1, 1)] = np.array([[0, 6], [6, 0]])
+    assert np.array_equal(store[(1, 1)], [[0, 6], [6, 0]])
+    merged = MergedPartition(mb).merge([0, 1])
+    store[(1, 2)] = merged
+    assert store[(1, 2)] is merged
+
+
+def test_memory_budget(tmp_path):
+    rank = {(1, 1): 3., (2, 2): 1., (3, 3): 2.}
+    mbs = {k: np.random.randint(0, 2 ** 20, size=100) for k in rank}
+
+    budget = MemoryBudget(800, protect=lambda: [(1, 1)], rank=rank.get)
+    store = ArrayStore(budget)
+    store.update(mbs)
+    # the worst point is protected; the next-worst is evicted
+    assert list(store) == [(1, 1), (2, 2)]
+
+    budget = MemoryBudget(800, spill_dir=str(tmp_path), rank=rank.get)
+    store = ArrayStore(budget)
+    store.update(mbs)
+    # the worst point is spilled
+    assert [p.suffix for p in tmp_path.iterdir()] == [".bin"]
+    assert store.nbytes <= 800
+    for k in rank:
+        assert np.array_equal(store[k], mbs[k])
+    del store[(1, 1)]
+    assert len(list(tmp_path.iterdir())) == 0
+
+
+def test_memory_budget_charges_merged_partitions():
+    budget = MemoryBudget(20000)
+    store = ArrayStore(budget)
+    for chain in range(4):
+        # each chain merges from a base partition of its own, as decoded from the store after a rollback
+        mb = MergedPartition(np.random.randint(0, 50, size=1000))
+        for i in range(10):
+            mb = mb.merge([0, 1])
+            store[(chain, i)] = mb
+            entries = [store[k] for k in store]
+            resident = sum({id(e.mb): e.mb.nbytes for e in entries}.values()) + \
+                sum(e.label.nbytes + e.n_r.nbytes for e in entries)
+            assert resident == store.nbytes <= 20000
+    assert (3, 9) in store
+
+
+def test_bounded_bookkeeping():
+    edgelist = bm.get_edgelist("dataset/test/southernWomen.edgelist", "\t")
+    types = bm.get_types("dataset/test/southernWomen.types")
+    oks = bm.OptimalKs(bm.engines.NumbaKL(), edgelist, types)
+    oks.set_bookkeeping(max_bytes=200)
+    oks.minimize_bisbm_dl()
+    assert (oks.summary()["ka"], oks.summary()["kb"]) == (1, 1)
+    assert len(oks.bookkeeping_mb["mcmc"]) < len(oks.bookkeeping_dl)
+
+
+def test_checkpoint_and_resume(tmp_path):
+    edgelist = bm.get_edgelist("dataset/test/southernWomen.edgelist", "\t")
+    types = bm.get_types("dataset/test/southernWomen.types")
+    path = str(tmp_path / "oks.ckpt")
+    np.random.seed(1)
+    random.seed(1)
+    oks = bm.OptimalKs(bm.engines.NumbaKL(), edgelist, types)
+    oks.set_checkpoint(path)
+    oks.minimize_bisbm_dl()
+    params, records = Checkpoint(path).read()
+    assert len(records) > 4
+
+    # the process dies while writing the 5th evaluation
+    checkpoint = Checkpoint(path)
+    checkpoint.start(params)
+    for record in records[:4]:
+        checkpoint.append(record)
+    with open(path, "ab") as f:
+        f.write(pickle.dumps(records[4])[:100])
+
+    # reading does not touch the file, in case the resumed search never writes
+    size = os.path.getsize(path)
+    assert len(Checkpoint(path).read()[1]) == 4
+    assert os.path.getsize(path) == size
+
+    np.random.seed(2)
+    random.seed(2)
+    oks_ = bm.OptimalKs(bm.engines.NumbaKL(), edgelist, types)
+    oks_.resume(path)
+    assert oks_.trace_k == oks.trace_k
+    assert oks_.bookkeeping_dl == oks.bookkeeping_dl
+    assert [r["k"] for r in Checkpoint(path).read()[1]] == [r["k"] for r in records]
+
+
+def test_result_cache_lru(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=2500)
+    for i in range(3):
+        cache.put({"k": i}, bytes(1000))
+        assert cache.get({"k": 0}) is not None  # the most recently used
+    assert cache.get({"k": 1}) is None
+    assert cache.get({"k": 2}) == bytes(1000)
+    assert cache.get({"k": 3}) is None
+
+
+def test_result_cache_across_instances(tmp_path):
+    edgelist = bm.get_edgelist("dataset/test/southernWomen.edgelist", "\t")
+    types = bm.get_types("dataset/test/southernWomen.types")
+    oks = bm.OptimalKs(bm.engines.NumbaKL(), edgelist, types, seed=1)
+    oks.set_result_cache(str(tmp_path))
+    oks.minimize_bisbm_dl()
+
+    # another instance, with other parameters of the heuristic
+    oks_ = bm.OptimalKs(bm.engines.NumbaKL(), edgelist, types, seed=1)
+    oks_.set_result_cache(str(tmp_path))
+    oks_.set_nm(5)
+    for ka, kb in oks.bookkeeping_dl:
+        # book-kept, since the points far from the initial one are keyed by its partition, which they start from
+        oks_.compute_and_update(ka, kb, recompute=False)
+        assert oks_.bookkeeping_dl[(ka, kb)] == oks.bookkeeping_dl[(ka, kb)]
+        assert np.array_equal(oks_.bookkeeping_mb["mcmc"][(ka, kb)], oks.bookkeeping_mb["mcmc"][(ka, kb)])
+    assert oks_._n_engine_calls == 0
+
+    # the same point, started from different partitions
+    keys = [oks_._get_result_key(1, 8, 0, init_k) for init_k in [None] + list(oks.bookkeeping_dl)[1:3]]
+    assert len(set(map(str, keys))) == 3
+
+    oks_ = bm.OptimalKs(bm.engines.NumbaKL(kl_steps=2), edgelist, types, seed=1)
+    oks_.set_result_cache(str(tmp_path))
+    oks_.compute_dl(2, 2)
+    assert oks_._n_engine_calls == 1
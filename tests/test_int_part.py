@@ -0,0 +1,50 @@
+import pickle
+import numpy as np
+import pytest
+from biSBM.int_part import Q_CACHE_VERSION, QCache, init_q_cache, log_q, log_sum
+
+
+def dense_q_cache(n_max):
+    cache = np.full((n_max + 1, n_max + 1), -np.inf)
+    for n in range(1, n_max + 1):
+        cache[n][1] = 0
+        for k in range(2, n + 1):
+            cache[n][k] = log_sum(cache[n][k], cache[n][k - 1])
+            if n > k:
+                cache[n][k] = log_sum(cache[n][k], cache[n - k][k])
+    return cache
+
+
+def test_lazy_q_cache_matches_dense_table():
+    dense = dense_q_cache(200)
+    q_cache = init_q_cache(200)
+    for n in [250, 199, 57, 3, 1, 0, 200]:
+        for k in [0, 1, 2, 5, 60, 300]:
+            assert log_q(n, k, q_cache) == log_q(n, k, dense)
+
+
+def test_q_cache_indexing_out_of_the_triangle():
+    dense = dense_q_cache(20)
+    q_cache = init_q_cache(20)
+    assert q_cache[5, 9] == q_cache[5, 5] == dense[5][5]
+    assert q_cache[20, 21] == dense[20][20]
+    for n, k in [(21, 1), (-1, 0), (3, -1)]:
+        with pytest.raises(IndexError):
+            q_cache[n, k]
+
+
+def test_mmap_q_cache(tmp_path):
+    dense = dense_q_cache(100)
+    q_cache = QCache(100, path=str(tmp_path / "q.npy"))
+    assert q_cache[100, 37] == dense[100][37]
+    q_cache = pickle.loads(pickle.dumps(q_cache))
+    assert isinstance(q_cache._table, np.memmap)
+    assert q_cache[99, 99] == pytest.approx(dense[99][99])
+
+
+def test_q_cache_dir_is_reused(tmp_path):
+    q_cache = init_q_cache(100, cache_dir=str(tmp_path))
+    assert q_cache.path.endswith("q_cache-v{}-100.npy".format(Q_CACHE_VERSION))
+    assert init_q_cache(50, cache_dir=str(tmp_path)).path == q_cache.path
+    assert init_q_cache(50, cache_dir=str(tmp_path))[50, 7] == q_cache[50, 7]
+    assert init_q_cache(200, cache_dir=str(tmp_path)).path != q_cache.path
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+import biSBM as bm
+from biSBM.ioutils import get_edgelist, get_types, load_graph, relabel_edgelist, save_graph
+
+
+def test_get_edgelist_skips_comments_and_blank_lines(tmp_path):
+    f_edgelist = tmp_path / "graph.edgelist"
+    f_edgelist.write_text("# source,target\n\n0,3\n1,4  # a comment\n\n2,5,1.5\n")
+    for chunk_size in [3, 2 ** 24]:
+        edgelist = get_edgelist(str(f_edgelist), chunk_size=chunk_size)
+        assert edgelist.tolist() == [[0, 3], [1, 4], [2, 5]]
+
+
+def test_get_edgelist_dtype(tmp_path):
+    f_edgelist = tmp_path / "graph.edgelist"
+    edgelist = np.arange(2000).reshape(-1, 2)
+    np.savetxt(str(f_edgelist), edgelist, fmt="%d", delimiter="\t")
+    _edgelist = get_edgelist(str(f_edgelist), dtype=np.int32, chunk_size=100)
+    assert _edgelist.dtype == np.int32
+    assert np.all(_edgelist == edgelist)
+
+
+def test_get_edgelist_drops_extra_columns(tmp_path):
+    f_edgelist = tmp_path / "graph.edgelist"
+    for text in ["0 1 5\n2 3 6\n\n", "0 1 0.5\n2 3 1.5\n", "0\t1\t5\t7\n2\t3\n"]:
+        f_edgelist.write_text(text)
+        for chunk_size in [3, 2 ** 24]:
+            assert get_edgelist(str(f_edgelist), chunk_size=chunk_size).tolist() == [[0, 1], [2, 3]]
+
+
+def test_get_edgelist_reports_malformed_row(tmp_path):
+    f_edgelist = tmp_path / "graph.edgelist"
+    for text, line in [("0 3\n1 4\n\n2\n", 4), ("0 1 7\n2\n", 2), ("0 1\n2 x\n", 2), ("0,1\n2,\n", 2)]:
+        f_edgelist.write_text(text)
+        with pytest.raises(ValueError, match="line {}".format(line)):
+            get_edgelist(str(f_edgelist))
+
+
+def test_save_and_load_graph(tmp_path):
+    edgelist = get_edgelist("dataset/test/southernWomen.edgelist", "\t")
+    types = get_types("dataset/test/southernWomen.types")
+    node_ids = ["node-{}".format(_) for _ in range(len(types))]
+    save_graph(str(tmp_path / "graph"), edgelist, types, node_ids=node_ids)
+    for mmap_mode in ["r", None]:
+        graph = load_graph(str(tmp_path / "graph.npz"), mmap_mode=mmap_mode)
+        assert isinstance(graph["edgelist"], np.memmap) == (mmap_mode is not None)
+        assert np.all(graph["edgelist"] == edgelist)
+        assert np.all(graph["types"] == types)
+        assert graph["node_ids"].tolist() == node_ids
+        assert (graph["na"], graph["nb"], graph["e"]) == (np.sum(types == 1), np.sum(types == 2), len(edgelist))
+
+
+def test_optimalks_uses_memory_mapped_graph(tmp_path):
+    edgelist = get_edgelist("dataset/test/bisbm-n_1000-ka_4-kb_6.edgelist")
+    save_graph(str(tmp_path / "graph.npz"), edgelist, [1] * 500 + [2] * 500)
+    graph = load_graph(str(tmp_path / "graph.npz"))
+    oks = bm.OptimalKs(bm.engines.NumbaMCMC(), graph["edgelist"], graph["types"])
+    assert oks.edgelist is graph["edgelist"]
+    oks.compute_and_update(1, 1)
+    assert oks.summary_dl(1, 1)["dl"] == 56078.5634561319
+
+
+def test_relabel_edgelist(tmp_path):
+    f_edgelist = tmp_path / "graph.edgelist"
+    f_edgelist.write_text("# user item\n900000000001 7\n42 7\n900000000001 3\n\n42 3\n5 7\n")
+    for chunk_size in [4, 2 ** 24]:
+        edgelist, types, new2old = relabel_edgelist(str(f_edgelist), chunk_size=chunk_size)
+        assert edgelist.tolist() == [[0, 3], [1, 3], [0, 4], [1, 4], [2, 3]]
+        assert types.tolist() == [1, 1, 1, 2, 2]
+        assert new2old.tolist() == [900000000001, 42, 5, 7, 3]
+
+    f_edgelist.write_text("1 7 0.5\n2 7 1.5\n\n")
+    for dtype in [np.int64, str]:
+        edgelist, types, new2old = relabel_edgelist(str(f_edgelist), dtype=dtype)
+        assert new2old[edgelist].astype(np.int64).tolist() == [[1, 7], [2, 7]]
+
+    f_edgelist.write_text("alice,book\nbob,book\nalice,pen\n")
+    edgelist, types, new2old = relabel_edgelist(str(f_edgelist), dtype=str)
+    assert types.tolist() == [1, 1, 2, 2]
+    assert new2old[edgelist].tolist() == [["alice", "book"], ["bob", "book"], ["alice", "pen"]]
+
+
+def test_relabel_edgelist_is_independent_of_chunk_size(tmp_path):
+    f_edgelist = tmp_path / "graph.edgelist"
+    f_edgelist.write_text("zoe,pen\nbob,book\nzoe,book\n\namy, cup\nbob,pen\n")
+    results = [relabel_edgelist(str(f_edgelist), dtype=str, chunk_size=chunk_size) for chunk_size in [4, 2 ** 24]]
+    for edgelist, types, new2old in results:
+        assert edgelist.tolist() == [[0, 3], [1, 4], [0, 4], [2, 5], [1, 3]]
+        assert types.tolist() == [1, 1, 1, 2, 2, 2]
+        assert new2old.tolist() == ["zoe", "bob", "amy", "pen", "book", "cup"]
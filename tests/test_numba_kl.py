@@ -0,0 +1,44 @@
+import numpy as np
+import biSBM as bm
+
+
+kl = bm.engines.NumbaKL(
+    n_sweeps=1,
+    is_parallel=True,
+    n_cores=2,
+    kl_steps=5,
+    kl_itertimes=1,
+    kl_is_parallel=True  # nested in the parallel sweeps of OptimalKs
+)
+
+edgelist = bm.get_edgelist("dataset/test/southernWomen.edgelist", "\t")
+types = bm.get_types("dataset/test/southernWomen.types")
+
+oks = bm.OptimalKs(kl, edgelist, types, default_args=True, random_init_k=False)
+
+
+def test_answer():
+    oks.minimize_bisbm_dl()
+    ka = oks.summary()["ka"]
+    kb = oks.summary()["kb"]
+    assert (ka, kb) == (1, 1)  # there exists no community structure in the southernWomen dataset
+
+
+def test_planted_partition():
+    np.random.seed(42)
+    edgelist = bm.get_edgelist("dataset/test/bisbm-n_1000-ka_4-kb_6.edgelist")
+    mb = bm.engines.NumbaKL().engine(edgelist, 500, 500, 4, 6)
+    assert len(mb) == 1000
+    assert sorted(set(mb[:500])) == [0, 1, 2, 3]
+    assert sorted(set(mb[500:])) == [4, 5, 6, 7, 8, 9]
+    # the type-a blocks of the planted partition are of equal sizes
+    assert np.all(np.bincount(mb[:500]) == 125)
+
+
+def test_parallel_restarts():
+    edgelist = bm.get_edgelist("dataset/test/bisbm-n_1000-ka_4-kb_6.edgelist")
+    np.random.seed(42)
+    mb = bm.engines.NumbaKL(kl_steps=4).engine(edgelist, 500, 500, 4, 6)
+    np.random.seed(42)
+    mb_ = bm.engines.NumbaKL(n_cores=4, kl_steps=4, kl_is_parallel=True).engine(edgelist, 500, 500, 4, 6)
+    assert np.all(mb == mb_)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+import biSBM as bm
+from engines.numba_mcmc import fit_mb_to_k
+from biSBM.utils import assemble_n_r_from_mb, get_desc_len_from_data
+
+
+mcmc = bm.engines.NumbaMCMC(n_sweeps=1)
+# the schedule that `OptimalKs(..., default_args=True)` sets for this graph
+mcmc.set_steps(1000 * 1e5)
+mcmc.set_await_steps(1000 * 2e3)
+mcmc.set_cooling_param_1(1000 * 1e3)
+
+edgelist = bm.get_edgelist("dataset/test/bisbm-n_1000-ka_4-kb_6.edgelist")
+types = mcmc.gen_types(500, 500)
+
+
+def test_engine_finds_planted_partition():
+    np.random.seed(42)
+    mb = mcmc.engine(edgelist, 500, 500, 4, 6)
+    assert len(set(mb[:500])) == 4
+    assert len(set(mb[500:])) == 6
+    dl = get_desc_len_from_data(500, 500, len(edgelist), 4, 6, edgelist, mb,
+                                nr=assemble_n_r_from_mb(mb))
+    assert dl == pytest.approx(49529.669498710464)
+
+
+def test_seed():
+    mb = mcmc.engine(edgelist, 500, 500, 3, 4, seed=np.random.SeedSequence(1, spawn_key=(3, 4)))
+    assert np.array_equal(mcmc.engine(edgelist, 500, 500, 3, 4, seed=np.random.SeedSequence(1, spawn_key=(3, 4))), mb)
+    assert np.array_equal(mcmc.engine(edgelist, 500, 500, 3, 4, seed=np.random.default_rng(1)),
+                          mcmc.engine(edgelist, 500, 500, 3, 4, seed=1))
+
+
+def test_warm_start_changes_k():
+    np.random.seed(42)
+    mb = mcmc.engine(edgelist, 500, 500, 4, 6)
+    for ka, kb in [(3, 4), (5, 7)]:
+        mb_ = mcmc.engine(edgelist, 500, 500, ka, kb, mb=mb)
+        assert len(set(mb_[:500])) == ka
+        assert len(set(mb_[500:])) == kb
+        assert set(mb_[500:]) == set(range(ka, ka + kb))
+
+
+def test_fit_mb_to_unbalanced_k():
+    # from 125 blocks of 4 nodes per type, down to very unbalanced block counts
+    for ka, kb in [(1, 8), (8, 1)]:
+        mb = fit_mb_to_k(edgelist, np.arange(1000) // 4, 500, 500, ka, kb, rng=1)
+        assert set(mb[:500]) == set(range(ka))
+        assert set(mb[500:]) == set(range(ka, ka + kb))
+
+
+def test_summary_dl_at_1_1():
+    oks = bm.OptimalKs(mcmc, edgelist, types, default_args=True, random_init_k=False)
+    oks.compute_and_update(1, 1)
+    dl = oks.summary_dl(1, 1)
+    assert dl["dl"] == 56078.5634561319
+    assert dl["adjacency"] == 51884.81583464478
+
+
+def test_issue_12():
+    edgelist = [[0, 3], [0, 4], [0, 5], [1, 3], [1, 4], [1, 5], [2, 6], [2, 7], [2, 8]]
+    types = [1, 1, 1, 2, 2, 2, 2, 2, 2]
+    oks = bm.OptimalKs(mcmc, edgelist, types)
+    oks.minimize_bisbm_dl()
+    dl = oks.summary()
+    assert dl["mdl"] == pytest.approx(15.615238196841506)
@@ -0,0 +1,123 @@
+from concurrent.futures import Future
+import numpy as np
+import pytest
+import biSBM as bm
+import biSBM.optimalks
+
+
+edgelist = bm.get_edgelist("dataset/test/southernWomen.edgelist", "\t")
+types = bm.get_types("dataset/test/southernWomen.types")
+
+
+def test_batch_neighbor_search():
+    oks = bm.OptimalKs(bm.engines.NumbaKL(n_cores=2), edgelist, types, default_args=True, random_init_k=False)
+    oks.set_batch_neighbor_search()
+    oks.minimize_bisbm_dl()
+    assert (oks.summary()["ka"], oks.summary()["kb"]) == (1, 1)
+    assert oks.trace_k[-1] == ("mdl", 1, 1)
+
+
+def test_batch_neighbor_search_matches_serial_search():
+    for max_dl_evals in [None, 6]:
+        searches = []
+        for batch in [False, True]:
+            kl_ = bm.engines.NumbaKL(n_sweeps=2, is_parallel=True, n_cores=2)
+            oks = bm.OptimalKs(kl_, edgelist, types, default_args=True, random_init_k=True, seed=7)
+            oks.set_batch_neighbor_search(batch)
+            oks.minimize_bisbm_dl(max_dl_evals=max_dl_evals)
+            searches += [(oks.trace_k, list(oks.bookkeeping_dl.items()), oks._n_runs, oks._n_dl_evals,
+                          oks._n_engine_calls, oks.get_profile()["engine_calls"])]
+        assert searches[0] == searches[1]
+
+
+def _patch_executor(monkeypatch, n_done):
+    """Replace the executor of the batch search with one that runs the first ``n_done`` tasks at once, and never the
+    others; return the list of their futures."""
+    futures = []
+
+    class Executor(object):
+        def submit(self, fn, *args):
+            futures.append(Future())
+            if len(futures) <= n_done:
+                futures[-1].set_result(fn(*args))
+            return futures[-1]
+
+    monkeypatch.setattr(biSBM.optimalks, "get_reusable_executor", lambda **kwargs: Executor())
+    return futures
+
+
+def test_batch_neighbor_search_stops_at_budget(monkeypatch):
+    futures = _patch_executor(monkeypatch, 3)
+    oks = bm.OptimalKs(bm.engines.NumbaKL(n_cores=2), edgelist, types, default_args=True, random_init_k=False)
+    oks._set_budget(max_dl_evals=2)
+    results = oks._compute_dl_in_batch([(2, 2), (3, 3), (4, 4)], -np.inf)
+    assert max(next(results)[2]) + 1 == 4
+    assert max(next(results)[2]) + 1 == 6
+    # the third point does not fit in the budget, hence it is not submitted
+    with pytest.raises(biSBM.optimalks._BudgetExhausted):
+        next(results)
+    assert len(futures) == 2
+    assert (oks._n_dl_evals, oks.get_profile()["engine_calls"]) == (2, 2 * oks.max_n_sweeps_)
+    assert oks._n_runs == {(2, 2): 1, (3, 3): 1, (4, 4): 0}
+
+
+def test_batch_neighbor_search_cancels_pending_points(monkeypatch):
+    futures = _patch_executor(monkeypatch, 1)
+    oks = bm.OptimalKs(bm.engines.NumbaKL(n_cores=2), edgelist, types, default_args=True, random_init_k=False)
+    results = oks._compute_dl_in_batch([(2, 2), (3, 3), (4, 4)], -np.inf)
+    next(results)
+    results.close()
+    assert len(futures) == 3 and all(f.cancelled() for f in futures[1:])
+    # the pending points are neither charged nor counted, and their run indices are given back
+    assert (oks._n_dl_evals, oks.get_profile()["engine_calls"]) == (1, oks.max_n_sweeps_)
+    assert oks._n_runs == {(2, 2): 1, (3, 3): 0, (4, 4): 0}
+
+
+def test_budget():
+    oks = bm.OptimalKs(bm.engines.NumbaKL(), edgelist, types, default_args=True, random_init_k=False)
+    oks.minimize_bisbm_dl(max_dl_evals=3)
+    # (1, 1), the initial point, and a neighbor
+    assert len(oks.bookkeeping_dl) == 3
+    assert oks.trace_k[-1] == ("budget",) + oks.summary(mode="simple")[:2]
+
+    oks = bm.OptimalKs(bm.engines.NumbaKL(), edgelist, types, default_args=True, random_init_k=False)
+    oks.minimize_bisbm_dl(max_engine_calls=0)
+    assert list(oks.bookkeeping_dl) == [(1, 1)]
+
+
+def test_seed():
+    traces = []
+    for _ in range(2):
+        kl_ = bm.engines.NumbaKL(n_sweeps=2, is_parallel=True, n_cores=2)
+        oks = bm.OptimalKs(kl_, edgelist, types, default_args=True, random_init_k=True, seed=7)
+        oks.minimize_bisbm_dl()
+        traces += [(oks.trace_k, list(oks.bookkeeping_dl.items()))]
+    assert traces[0] == traces[1]
+
+
+def test_profile():
+    phases = []
+    oks = bm.OptimalKs(bm.engines.NumbaKL(), edgelist, types, default_args=True, random_init_k=False)
+    oks.set_profile_callback(lambda phase, seconds, profile: phases.append(phase))
+    oks.minimize_bisbm_dl()
+    profile = oks.summary()["profile"]
+    assert profile["engine_calls"] == oks.max_n_sweeps_ * (len(oks.bookkeeping_dl) - 1)
+    assert profile["dl_evals"] >= len(oks.bookkeeping_dl)
+    assert profile["neighbor_checks"] == phases.count("neighbor_check") >= 1
+    assert profile["merges"] <= phases.count("merge")
+    assert profile["time"]["neighbor_check"] >= profile["time"]["engine"] > 0
+    # the in-process engine needs no temporary files
+    assert profile["tempfile_bytes"] == 0
+
+
+def test_shared_files_are_removed_after_a_failed_engine_call(monkeypatch):
+    def loky_executor(*args):
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(biSBM.optimalks, "loky_executor", loky_executor)
+    oks = bm.OptimalKs(bm.engines.NumbaKL(n_sweeps=2, is_parallel=True, n_cores=2), edgelist, types,
+                       default_args=True, random_init_k=False)
+    with pytest.raises(RuntimeError):
+        oks.compute_dl(2, 2)
+    # otherwise, `__del__` would skip the clean-up of the shared arrays
+    assert not oks._OptimalKs__del__no_call
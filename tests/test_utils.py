@@ -0,0 +1,152 @@
+import pickle
+import numpy as np
+import pytest
+from biSBM.utils import *
+
+
+def test_adjacency_entropy_multigraph():
+    edgelist = np.array([[0, 2], [0, 2], [1, 3]])
+    mb = np.array([0, 0, 1, 1])
+    assert adjacency_entropy(edgelist, mb) == pytest.approx(np.log(3))
+
+
+def test_assemble_eta_rk_from_edgelist_and_mb():
+    edgelist = np.array([[0, 2], [0, 3], [1, 3], [0, 4]])
+    mb = np.array([0, 0, 1, 1, 1])
+    eta_rk = assemble_eta_rk_from_edgelist_and_mb(edgelist, mb)
+    assert isinstance(eta_rk, np.ndarray)
+    assert np.array_equal(eta_rk, [[0, 1, 0, 1], [0, 2, 1, 0]])
+    eta_rk = assemble_eta_rk_from_edgelist_and_mb(edgelist, mb, sparse=True)
+    assert eta_rk.shape == (2, 4)
+    assert np.array_equal(eta_rk.toarray(), [[0, 1, 0, 1], [0, 2, 1, 0]])
+
+
+def test_degree_entropy_keeps_the_given_q_cache(monkeypatch):
+    edgelist = np.array([[0, 2], [0, 3], [1, 3], [0, 4]])
+    mb = np.array([0, 0, 1, 1, 1])
+    q_cache = init_q_cache(0)
+
+    def _rebuild(*args):
+        raise AssertionError("[ERROR] The given q_cache is rebuilt.")
+
+    monkeypatch.setattr("biSBM.utils.init_q_cache", _rebuild)
+    assert np.isfinite(degree_entropy(edgelist, mb, __q_cache=q_cache))
+
+
+def test_block_state_moves_and_merges():
+    edgelist, types = gen_bicliques_edgelist(3, 8)
+    edgelist = np.vstack([edgelist, [[0, 4], [8, 13], [17, 21]]])
+    old2new, _, _ = assemble_old2new_mapping(types)
+    edgelist = assemble_edgelist_old2new(edgelist, old2new)
+    na = nb = 12
+    mb = np.array([0, 1, 2, 0, 1, 2, 0, 1, 2, 0, 1, 2] + [3, 4, 3, 4, 3, 4, 3, 4, 3, 4, 3, 4])
+    state = BlockState(edgelist, mb, na, nb, 3, 2)
+
+    def desc_len():
+        return get_desc_len_from_data(na, nb, len(edgelist), state.ka, state.kb, edgelist, state.mb,
+                                      nr=assemble_n_r_from_mb(state.mb))
+
+    assert state.entropy() == pytest.approx(desc_len())
+    for v, s in [(0, 1), (13, 3), (5, 0), (20, 4)]:
+        dl = desc_len()
+        ds = state.virtual_move_ds(v, s)
+        state.move(v, s)
+        assert desc_len() - dl == pytest.approx(ds)
+    dl = desc_len()
+    ds = state.virtual_merge_ds(2, 0)
+    # the terms left out are the same for all the merges of a type
+    assert ds - state.virtual_merge_ds(2, 0, relative=True) == pytest.approx(
+        state.virtual_merge_ds(1, 0) - state.virtual_merge_ds(1, 0, relative=True))
+    state.merge(2, 0)
+    assert (state.ka, state.kb) == (2, 2)
+    assert np.array_equal(state.e_rs, assemble_e_rs_from_mb(edgelist, state.mb))
+    assert desc_len() - dl == pytest.approx(ds)
+
+
+def test_virtual_moves_ds():
+    e_rs = np.array([[0, 0, 0, 5, 1],
+                     [0, 0, 0, 4, 1],
+                     [0, 0, 0, 0, 9],
+                     [5, 4, 0, 0, 0],
+                     [1, 1, 9, 0, 0]])
+    mlists = assemble_merge_candidates(3, 2)
+    assert mlists.tolist() == [[0, 1], [0, 2], [1, 2], [3, 4]]
+    ds, mlist = virtual_moves_ds(e_rs, mlists, 3)
+    assert mlist.tolist() == [0, 1]
+    assert ds == pytest.approx(np.log(comb(11, 5)) - np.log(comb(9, 5)) - np.log(comb(2, 1)))
+
+
+def test_shared_array_pickles_by_name(tmp_path):
+    edgelist = np.arange(20).reshape(10, 2)
+    shared = SharedArray(str(tmp_path / "edgelist.npy"), edgelist)
+    assert len(pickle.dumps(shared)) < 200
+    shared = pickle.loads(pickle.dumps(shared))
+    assert not np.asarray(shared).flags.writeable  # memory-mapped in read-only mode
+    assert np.all(np.asarray(shared, dtype=np.int_) == edgelist)
+
+
+def test_old2new_mapping():
+    types = np.array([2, 1, 2, 1, 1])
+    old2new, new2old, new_types = assemble_old2new_mapping(types)
+    assert old2new == {1: 0, 3: 1, 4: 2, 0: 3, 2: 4}
+    assert new2old == {0: 1, 1: 3, 2: 4, 3: 0, 4: 2}
+    assert new_types.tolist() == [1, 1, 1, 2, 2]
+    edgelist = np.array([[1, 0], [3, 2], [4, 0]])
+    assert assemble_edgelist_old2new(edgelist, old2new).tolist() == [[0, 3], [1, 4], [2, 3]]
+    mb = np.array([0, 1, 1, 2, 3])
+    assert assemble_mb_new2old(mb, new2old).tolist() == [2, 0, 3, 1, 1]
+
+
+def test_assemble_e_rs_from_mb():
+    edgelist = np.array([[0, 2], [0, 3], [1, 3], [1, 1]])
+    mb = [0, 0, 1, 1]
+    e_rs = assemble_e_rs_from_mb(edgelist, mb)
+    assert np.array_equal(e_rs, [[2, 3], [3, 0]])
+    assert np.array_equal(assemble_e_rs_from_mb(edgelist, mb, sparse=True).toarray(), e_rs)
+
+
+def test_merges_without_edgelist():
+    edgelist = np.array([[0, 4], [0, 5], [1, 5], [2, 6], [3, 6], [3, 7], [2, 4]])
+    mb = np.array([0, 1, 2, 2, 3, 4, 4, 5])
+    e_rs = assemble_e_rs_from_mb(edgelist, mb)
+    mb_ = MergedPartition.from_mb(mb)
+    for mlist in [[1, 0], [3, 4], [1, 2]]:
+        mb = accept_mb_merge(mb, np.array(mlist))
+        mb_ = mb_.merge(mlist)
+        e_rs = accept_e_rs_merge(e_rs, mlist)
+        assert np.array_equal(np.asarray(mb_), mb)
+        assert np.array_equal(mb_.n_r, assemble_n_r_from_mb(mb))
+        assert np.array_equal(e_rs, assemble_e_rs_from_mb(edgelist, mb))
+    assert max(mb_) == 2 and len(mb_) == 8
+
+
+def test_gen_bisbm_edgelist(tmp_path):
+    e_rs = gen_e_rs(3, 300, p=0.2)
+    n_r = [10, 20, 30, 15, 15, 30]
+    mb = np.repeat(np.arange(6), n_r)
+    edgelist = gen_bisbm_edgelist(e_rs, n_r, 3, seed=1)
+    assert np.array_equal(assemble_e_rs_from_mb(edgelist, mb), e_rs)
+    assert np.array_equal(gen_bisbm_edgelist(e_rs, n_r, 3, seed=1), edgelist)
+
+    degrees = np.bincount(edgelist.ravel(), minlength=len(mb))
+    edgelist_ = gen_bisbm_edgelist(e_rs[:3, 3:], n_r, 3, degrees=degrees, seed=2)
+    assert np.array_equal(np.bincount(edgelist_.ravel(), minlength=len(mb)), degrees)
+    assert np.array_equal(assemble_e_rs_from_mb(edgelist_, mb), e_rs)
+
+    path = str(tmp_path / "bisbm.edgelist")
+    gen_bisbm_edgelist(e_rs[:3, 3:], n_r, 3, degrees=degrees, seed=2, f_edgelist=path, chunk_size=7)
+    assert np.array_equal(np.loadtxt(path, dtype=np.int_), edgelist_)
+
+
+def test_gen_e_rs_harder():
+    np.random.seed(1)
+    e_rs = gen_e_rs_harder(3, 5, 1000, samples=100, top_k=4, batch_size=32)
+    assert len(e_rs) == 4
+    likelihoods = [compute_profile_likelihood_from_e_rs(e) for e in e_rs]
+    assert likelihoods == sorted(likelihoods, reverse=True)
+    for e in e_rs:
+        assert e.sum() == 2 * 1000 and np.array_equal(e, e.T) and not e[:3, :3].any()
+
+    np.random.seed(1)
+    best = gen_e_rs_harder(3, 5, 1000, samples=100, top_k=1)
+    assert np.array_equal(best, e_rs[0])